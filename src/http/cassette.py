@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Record/replay cassettes shared by the bypass wrappers.
+In record mode every request/response pair is appended to a JSON Lines file
+with cookies and credentials redacted. In replay mode responses are served
+from that file without touching the network, optionally with the recorded
+or a synthetic latency.
+
+The wrappers run once per request, so replay keeps a sidecar index
+(<cassette>.idx, key -> byte offset of the latest entry). Only the first
+replay after the cassette changes scans the whole file; later ones read the
+index and a single line.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+REDACTED = "[REDACTED]"
+
+# Header and JSON body keys whose values must never be written to a cassette
+SENSITIVE_HEADERS = {
+    "authorization",
+    "cookie",
+    "set-cookie",
+    "api-key",
+    "api-username",
+    "user-api-key",
+    "user-api-client-id",
+    "x-csrf-token",
+}
+SENSITIVE_KEYS = {"password", "second_factor_token", "csrf", "api_key", "user_api_key"}
+
+# CSRF token embedded in HTML pages (e.g. the homepage warm-up)
+CSRF_META_RE = re.compile(r'(<meta\s+name="csrf-token"\s+content=")[^"]*(")', re.IGNORECASE)
+
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL so equivalent requests share a key (sorted query, no fragment)."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path or "/", query, ""))
+
+
+def request_key(method: str, url: str, body: Optional[str]) -> str:
+    """Stable key for a request: method, normalized URL and body."""
+    raw = f"{method.upper()} {normalize_url(url)}\n{body or ''}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def redact_headers(headers: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Replace sensitive header values with a placeholder."""
+    return {
+        k: (REDACTED if k.lower() in SENSITIVE_HEADERS else v)
+        for k, v in (headers or {}).items()
+    }
+
+
+def _redact_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            k: (REDACTED if k.lower() in SENSITIVE_KEYS else _redact_value(v))
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [_redact_value(v) for v in value]
+    return value
+
+
+def redact_body(body: Optional[str]) -> Optional[str]:
+    """Redact credential fields from a JSON body and CSRF meta tags from HTML."""
+    if not body:
+        return body
+    try:
+        return json.dumps(
+            _redact_value(json.loads(body)), ensure_ascii=False, separators=(",", ":")
+        )
+    except (ValueError, TypeError):
+        return CSRF_META_RE.sub(rf"\g<1>{REDACTED}\g<2>", body)
+
+
+def record_exchange(
+    cassette: Dict, data: Dict, result: Dict, elapsed_ms: float
+) -> None:
+    """Append a normalized, redacted request/response pair to the cassette file."""
+    path = cassette.get("path")
+    if not path:
+        return
+    entry = {
+        "key": request_key(data["method"], data["url"], data.get("body")),
+        "method": data["method"].upper(),
+        "url": normalize_url(data["url"]),
+        "request_headers": redact_headers(data.get("headers")),
+        "request_body": redact_body(data.get("body")),
+        "status": result.get("status"),
+        "headers": redact_headers(result.get("headers")),
+        "body": redact_body(result.get("body")),
+        "elapsed_ms": round(elapsed_ms, 1),
+        "recorded_at": time.time(),
+    }
+    line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+    try:
+        with open(path, "ab+") as f:
+            # Start on a fresh line if an earlier writer died mid-entry
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = "\n" + line
+            f.write(line.encode("utf-8"))
+    except OSError as e:
+        print(f"[WARNING] Failed to write cassette {path}: {e}", file=sys.stderr)
+
+
+def _build_index(path: str) -> Dict[str, int]:
+    """Map each key to the byte offset of its latest entry, skipping bad lines."""
+    index: Dict[str, int] = {}
+    with open(path, "rb") as f:
+        offset = 0
+        for lineno, raw in enumerate(f, start=1):
+            line = raw.strip()
+            if line:
+                try:
+                    key = json.loads(line).get("key")
+                except (ValueError, AttributeError):
+                    key = None
+                if isinstance(key, str):
+                    index[key] = offset  # Latest recording wins
+                else:
+                    print(
+                        f"[WARNING] Skipping malformed cassette line {lineno} in {path}",
+                        file=sys.stderr,
+                    )
+            offset += len(raw)
+    return index
+
+
+def _load_index(path: str) -> Dict[str, int]:
+    """Read the sidecar index, rebuilding it when the cassette has changed."""
+    stat = os.stat(path)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    index_path = f"{path}.idx"
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("stamp") == stamp:
+            return cached["offsets"]
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+
+    offsets = _build_index(path)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"stamp": stamp, "offsets": offsets}, f)
+        os.replace(tmp_path, index_path)
+    except OSError as e:
+        # Read-only location: still works, just rescans on every replay
+        print(f"[DEBUG] Could not write cassette index {index_path}: {e}", file=sys.stderr)
+    return offsets
+
+
+def replay_exchange(cassette: Dict, data: Dict) -> Dict:
+    """Serve a recorded response for this request without any network access."""
+    path = cassette.get("path")
+    key = request_key(data["method"], data["url"], data.get("body"))
+    match: Optional[Dict] = None
+    try:
+        offset = _load_index(path).get(key)
+        if offset is not None:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                match = json.loads(f.readline())
+    except (OSError, TypeError, ValueError) as e:
+        return {
+            "success": False,
+            "error": f"Failed to read cassette {path}: {e}",
+            "error_type": "CassetteError",
+        }
+
+    if match is None:
+        return {
+            "success": False,
+            "error": f"No cassette entry for {data['method']} {data['url']}",
+            "error_type": "CassetteMiss",
+        }
+
+    latency = cassette.get("latency", "recorded")
+    if latency == "recorded":
+        delay_ms = float(match.get("elapsed_ms") or 0)
+    elif isinstance(latency, (int, float)):
+        delay_ms = float(latency)
+    else:
+        delay_ms = 0.0
+    if delay_ms > 0:
+        time.sleep(delay_ms / 1000)
+
+    print(
+        f"[DEBUG] Replayed {match['method']} {match['url']} from cassette ({delay_ms:.0f}ms)",
+        file=sys.stderr,
+    )
+    return {
+        "success": True,
+        "status": match.get("status"),
+        "headers": match.get("headers") or {},
+        "body": match.get("body") or "",
+        "cookies": {},
+        "csrf_token": None,
+        "logged_in": False,
+        "replayed": True,
+    }
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Cloudflare challenge detection shared by the bypass wrappers.
+Lets a wrapper recognise a challenge response itself and retry in-process
+with another browser profile instead of handing it back to Node.js.
+"""
+
+from typing import Any, Mapping, Optional
+
+CHALLENGE_STATUSES = {403, 429, 503}
+
+# Markers found in Cloudflare interstitial and block pages
+CHALLENGE_MARKERS = (
+    "just a moment",
+    "attention required",
+    "/cdn-cgi/challenge-platform/",
+    "cf-challenge",
+)
+
+# Cookies bound to the browser fingerprint that passed (or failed) a challenge;
+# they are useless to a different impersonation profile
+FINGERPRINT_COOKIES = ("cf_clearance", "__cf_bm")
+
+
+def is_challenge(
+    status: Optional[int], headers: Optional[Mapping[str, Any]], body: Optional[str]
+) -> bool:
+    """True if a response is a Cloudflare challenge rather than a forum answer."""
+    normalized = {str(k).lower(): str(v).lower() for k, v in (headers or {}).items()}
+    if normalized.get("cf-mitigated") == "challenge":
+        return True
+
+    # JSON bodies come from Discourse itself, even on 403/429
+    if "json" in normalized.get("content-type", ""):
+        return False
+
+    text = (body or "").lower()
+    if status in CHALLENGE_STATUSES:
+        return any(marker in text for marker in CHALLENGE_MARKERS)
+    # Interstitials occasionally come back as 200 with the challenge script
+    return "/cdn-cgi/challenge-platform/" in text
+
+
+def next_profile(profiles: list, current: str) -> str:
+    """Pick the profile after `current`, wrapping around."""
+    if current not in profiles:
+        return profiles[0]
+    return profiles[(profiles.index(current) + 1) % len(profiles)]
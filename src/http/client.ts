@@ -1,6 +1,8 @@
 import { Logger } from "../util/logger.js";
 import { CloudscraperClient } from "./cloudscraper.js";
 import { CurlCffiClient } from "./curl_cffi.js";
+import { HttpMetrics, type Engine, type MetricEvent } from "./metrics.js";
+import { RequestScheduler, type RequestPriority } from "./scheduler.js";
 import {
   BrowserFallbackClient,
   BrowserFallbackRelayUnavailableError,
@@ -14,6 +16,13 @@ export type AuthMode =
 
 export type BypassMethod = "cloudscraper" | "curl_cffi" | "both";
 
+// Record/replay of wrapper traffic for offline benchmarks; replay never touches the network
+export interface CassetteOptions {
+  mode: "record" | "replay";
+  path: string;
+  latency?: "recorded" | "none" | number; // Replay delay: recorded timings, none, or fixed ms
+}
+
 export interface HttpClientOptions {
   baseUrl: string;
   timeoutMs: number;
@@ -28,8 +37,53 @@ export interface HttpClientOptions {
     second_factor_token?: string;
   };
   browserFallback?: BrowserFallbackOptions;
+  metrics?: HttpMetrics; // Shared runtime counters; a private instance is used when omitted
+  cassette?: CassetteOptions;
+  concurrency?: number; // Max concurrent upstream requests per host (default: 4)
+  scheduler?: RequestScheduler; // Shared scheduler; a private one sized by `concurrency` is used when omitted
+  keepAliveIntervalMs?: number; // Background session validation period; 0 or unset disables keep-alive
+}
+
+// Challenge verdict from a bypass wrapper, which retries once with another profile itself
+export interface ChallengeReport {
+  detected: boolean;
+  retried: boolean;
+  resolved: boolean;
+  profile?: string; // Profile that produced the returned response
+}
+
+export interface SessionHealth {
+  last_check_at?: string;
+  last_success_at?: string;
+  last_error?: string;
+  consecutive_failures: number;
+  cookie_expiry?: Record<string, string>;
+}
+
+export interface RequestOptions {
+  signal?: AbortSignal;
+  // Interactive tool calls run first; background work only uses leftover capacity
+  priority?: RequestPriority;
 }
 
+// Cookies whose upcoming expiry triggers a background renewal
+const RENEWABLE_COOKIES = ["cf_clearance", "_t"];
+// Cookies that make the wrappers skip login; dropped to force a fresh login
+const LOGIN_COOKIES = ["_t", "_forum_session", "authentication_data"];
+// Renew a tracked cookie this long before it would lapse
+const RENEW_BEFORE_MS = 5 * 60 * 1000;
+// How often the keep-alive looks at cookie expiry between validations
+const KEEPALIVE_TICK_MS = 60 * 1000;
+
+// Per-process counters reported by the Python wrappers, mapped to metric events
+const WRAPPER_EVENTS: Record<string, MetricEvent> = {
+  warmup: "warmup",
+  login: "login",
+  csrf_fetch: "csrf_fetch",
+  challenge_retry: "challenge_retry",
+  challenge_resolved: "challenge_resolved",
+};
+
 export class HttpError extends Error {
   constructor(public status: number, message: string, public body?: unknown) {
     super(message);
@@ -43,15 +97,25 @@ export class HttpClient {
   private userAgent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36 Edg/141.0.0.0";
   private cache = new Map<string, { value: any; expiresAt: number }>();
   private cookies = new Map<string, string>(); // Store cookies across requests
+  private cookieExpiry = new Map<string, number>(); // Cookie name -> expiry (epoch ms) reported by the wrappers
+  private bypassProfiles: Partial<Record<Engine, string>> = {}; // Wrapper profile that last passed a challenge
   private lastUrl: string | null = null; // Track last URL for Referer header
   private cloudscraperClient?: CloudscraperClient;
   private curlCffiClient?: CurlCffiClient;
   private bypassMethod: BypassMethod;
   private cloudscraperFailed = false; // Track if cloudscraper has failed
   private browserFallbackClient?: BrowserFallbackClient;
+  private metrics: HttpMetrics;
+  private scheduler: RequestScheduler;
+  private keepAliveTimer?: ReturnType<typeof setInterval>;
+  private keepAliveInFlight?: Promise<void>;
+  private lastSessionCheckAt = 0;
+  private sessionHealth: SessionHealth = { consecutive_failures: 0 };
 
   constructor(private opts: HttpClientOptions) {
     this.base = new URL(opts.baseUrl);
+    this.metrics = opts.metrics ?? new HttpMetrics();
+    this.scheduler = opts.scheduler ?? new RequestScheduler(opts.concurrency);
     
     // Determine bypass method (support legacy useCloudscraper option)
     if (opts.bypassMethod) {
@@ -82,6 +146,27 @@ export class HttpClient {
       this.browserFallbackClient = new BrowserFallbackClient(this.opts.logger, opts.browserFallback);
       this.opts.logger.info("Browser fallback enabled");
     }
+
+    this.startKeepAlive();
+  }
+
+  /**
+   * Renew Cloudflare clearance and the Discourse session in the background so
+   * foreground requests never pay for warm-up or re-login. Runs only when there
+   * is something to renew: login credentials, or a tracked cookie expiry.
+   */
+  private startKeepAlive() {
+    const keepAliveMs = this.opts.keepAliveIntervalMs ?? 0;
+    if (this.keepAliveTimer || keepAliveMs <= 0) return;
+    if (!(this.cloudscraperClient || this.curlCffiClient) || this.opts.cassette?.mode === "replay") return;
+    if (!this.opts.loginCredentials && !RENEWABLE_COOKIES.some((name) => this.cookieExpiry.has(name))) return;
+
+    this.lastSessionCheckAt = Date.now();
+    this.keepAliveTimer = setInterval(() => {
+      if (this.needsSessionRenewal(Date.now())) void this.keepAlive();
+    }, Math.min(KEEPALIVE_TICK_MS, keepAliveMs));
+    this.keepAliveTimer.unref?.();
+    this.opts.logger.info(`Session keep-alive enabled (every ${Math.round(keepAliveMs / 1000)}s)`);
   }
 
   private headers(): Record<string, string> {
@@ -141,26 +226,34 @@ export class HttpClient {
     }
   }
 
-  async get(path: string, { signal }: { signal?: AbortSignal } = {}) {
-    return this.request("GET", path, undefined, { signal });
+  async get(path: string, { signal, priority }: RequestOptions = {}) {
+    return this.request("GET", path, undefined, { signal, priority });
   }
 
-  async getCached(path: string, ttlMs: number, { signal }: { signal?: AbortSignal } = {}) {
+  async getCached(path: string, ttlMs: number, { signal, priority }: RequestOptions = {}) {
     const url = new URL(path, this.base).toString();
     const entry = this.cache.get(url);
     const now = Date.now();
-    if (entry && entry.expiresAt > now) return entry.value;
-    const value = await this.request("GET", path, undefined, { signal });
+    if (entry && entry.expiresAt > now) {
+      this.metrics.recordEvent(url, "cache_hit");
+      return entry.value;
+    }
+    this.metrics.recordEvent(url, "cache_miss");
+    const value = await this.request("GET", path, undefined, { signal, priority });
     this.cache.set(url, { value, expiresAt: now + ttlMs });
     return value;
   }
 
-  async post(path: string, body: unknown, { signal }: { signal?: AbortSignal } = {}) {
-    return this.request("POST", path, body, { signal });
+  async post(path: string, body: unknown, { signal, priority }: RequestOptions = {}) {
+    return this.request("POST", path, body, { signal, priority });
   }
 
-  private async request(method: string, path: string, body?: unknown, { signal }: { signal?: AbortSignal } = {}) {
-    const url = new URL(path, this.base).toString();
+  private async request(method: string, path: string, body?: unknown, { signal, priority = "interactive" }: RequestOptions = {}) {
+    const url = new URL(path, this.base);
+    return this.scheduler.run(url.host, priority, () => this.send(method, url.toString(), body, { signal }), signal);
+  }
+
+  private async send(method: string, url: string, body?: unknown, { signal }: { signal?: AbortSignal } = {}) {
     const headers = this.headers();
     if (body !== undefined) {
       headers["Content-Type"] = "application/json";
@@ -187,6 +280,9 @@ export class HttpClient {
         if (e instanceof HttpError) {
           throw e;
         }
+        if (this.opts.cassette?.mode === "replay") {
+          throw e; // Replay must stay offline
+        }
         this.opts.logger.info(`Bypass path failed, falling back to native fetch: ${e?.message || String(e)}`);
       }
     }
@@ -197,12 +293,23 @@ export class HttpClient {
 
     const attempt = async () => {
       try {
-        const res = await fetch(url, {
-          method,
-          headers,
-          body: body !== undefined ? JSON.stringify(body) : undefined,
-          signal: combinedSignal,
-        });
+        const startedAt = Date.now();
+        const endFetch = this.metrics.begin("fetch");
+        let res: Response;
+        try {
+          res = await fetch(url, {
+            method,
+            headers,
+            body: body !== undefined ? JSON.stringify(body) : undefined,
+            signal: combinedSignal,
+          });
+        } catch (fetchError) {
+          this.metrics.recordRequest(url, "fetch", Date.now() - startedAt, false);
+          throw fetchError;
+        } finally {
+          endFetch();
+        }
+        this.metrics.recordRequest(url, "fetch", Date.now() - startedAt, res.ok);
 
         this.opts.logger.debug(`HTTP ${method} ${url} -> ${res.status} ${res.statusText}`);
         
@@ -227,7 +334,10 @@ export class HttpClient {
           const text = await safeText(res);
           const errorBody = safeJson(text);
           const isChallenge = this.isCloudflareChallenge(res.status, text, responseHeaders);
-          if (isChallenge && this.browserFallbackClient?.isEnabled()) {
+          if (isChallenge) {
+            this.metrics.recordEvent(url, "cloudflare_challenge");
+          }
+          if (isChallenge && this.canUseBrowserFallback()) {
             this.opts.logger.info(`Cloudflare challenge detected via native fetch (${res.status}), switching to browser fallback`);
             return await this.tryBrowserFallback(method, url, headers, body);
           }
@@ -305,6 +415,12 @@ export class HttpClient {
     return Boolean((statusHit && (cfHeaderHit || bodyHit)) || bodyHit);
   }
 
+  // Trust the wrapper's verdict when it reports one; older wrappers and cassettes fall back to the heuristic
+  private isUnresolvedChallenge(result: { status?: number; body?: string; headers?: Record<string, string>; challenge?: ChallengeReport }): boolean {
+    if (result.challenge) return result.challenge.detected && !result.challenge.resolved;
+    return this.isCloudflareChallenge(result.status, result.body, result.headers);
+  }
+
   private isLoginRequired(finalUrl: string | undefined, bodyText: string | undefined): boolean {
     const u = (finalUrl || "").toLowerCase();
     const b = (bodyText || "").toLowerCase();
@@ -316,8 +432,13 @@ export class HttpClient {
     );
   }
 
+  // Replay must stay offline, so a replayed challenge never launches a browser
+  private canUseBrowserFallback(): boolean {
+    return Boolean(this.browserFallbackClient?.isEnabled()) && this.opts.cassette?.mode !== "replay";
+  }
+
   private async tryBrowserFallback(method: string, url: string, headers: Record<string, string>, body?: unknown): Promise<any> {
-    if (!this.browserFallbackClient?.isEnabled()) {
+    if (!this.browserFallbackClient || !this.canUseBrowserFallback()) {
       return undefined;
     }
 
@@ -329,7 +450,23 @@ export class HttpClient {
     };
 
     this.opts.logger.info(`Attempting browser fallback for ${method} ${url}`);
-    let response = await this.browserFallbackClient.request(browserRequest);
+    this.metrics.recordEvent(url, "browser_fallback");
+    const browserClient = this.browserFallbackClient;
+    const requestViaBrowser = async () => {
+      const startedAt = Date.now();
+      const end = this.metrics.begin("browser");
+      try {
+        const res = await browserClient.request(browserRequest);
+        this.metrics.recordRequest(url, "browser", Date.now() - startedAt, res.status < 400);
+        return res;
+      } catch (e) {
+        this.metrics.recordRequest(url, "browser", Date.now() - startedAt, false);
+        throw e;
+      } finally {
+        end();
+      }
+    };
+    let response = await requestViaBrowser();
 
       if (this.isLoginRequired(response.finalUrl, response.body)) {
         if (!this.opts.loginCredentials) {
@@ -339,7 +476,7 @@ export class HttpClient {
       const autoLoginAttempted = await this.browserFallbackClient.maybeAutoLogin(this.base.toString());
       if (autoLoginAttempted) {
         this.opts.logger.info(`Retrying browser fallback once after auto-login for ${method} ${url}`);
-        response = await this.browserFallbackClient.request(browserRequest);
+        response = await requestViaBrowser();
       }
 
       if (this.isLoginRequired(response.finalUrl, response.body)) {
@@ -379,6 +516,10 @@ export class HttpClient {
       timeout: Math.floor(this.opts.timeoutMs / 1000), // Convert to seconds
     };
 
+    if (this.opts.cassette) {
+      requestData.cassette = this.opts.cassette;
+    }
+
     // Add login credentials if provided
     if (this.opts.loginCredentials) {
       requestData.login = this.opts.loginCredentials;
@@ -392,7 +533,10 @@ export class HttpClient {
     if (this.cloudscraperClient && (this.bypassMethod === "cloudscraper" || !this.cloudscraperFailed)) {
       try {
         this.opts.logger.debug(`Using cloudscraper for ${method} ${url}`);
-        const result = await this.cloudscraperClient.request(requestData);
+        const cloudscraperClient = this.cloudscraperClient;
+        const result = await this.runBypassEngine("cloudscraper", url, () =>
+          cloudscraperClient.request({ ...requestData, profile: this.bypassProfiles.cloudscraper })
+        );
 
         if (!result.success) {
           throw new Error(`Cloudscraper error: ${result.error} (${result.error_type})`);
@@ -407,14 +551,18 @@ export class HttpClient {
             this.opts.logger.debug(`Stored cookie from cloudscraper: ${key}`);
           });
         }
+        this.rememberSession(result);
 
         // Update last URL for Referer header
         this.lastUrl = url;
 
         // Check for HTTP errors / Cloudflare challenge
         if (result.status && result.status >= 400) {
-          const isChallenge = this.isCloudflareChallenge(result.status, result.body, result.headers);
-          if (isChallenge && this.browserFallbackClient?.isEnabled()) {
+          const isChallenge = this.isUnresolvedChallenge(result);
+          if (isChallenge) {
+            this.metrics.recordEvent(url, "cloudflare_challenge");
+          }
+          if (isChallenge && this.canUseBrowserFallback()) {
             this.opts.logger.info(`Cloudflare challenge detected via cloudscraper (${result.status}), switching to browser fallback`);
             return await this.tryBrowserFallback(method, url, headers, body);
           }
@@ -424,7 +572,11 @@ export class HttpClient {
           throw new HttpError(result.status, `HTTP ${result.status}`, errorBody);
         }
 
-        if (this.isCloudflareChallenge(result.status, result.body, result.headers) && this.browserFallbackClient?.isEnabled()) {
+        const isChallengePage = this.isUnresolvedChallenge(result);
+        if (isChallengePage) {
+          this.metrics.recordEvent(url, "cloudflare_challenge");
+        }
+        if (isChallengePage && this.canUseBrowserFallback()) {
           this.opts.logger.info(`Cloudflare challenge page detected via cloudscraper (${result.status}), switching to browser fallback`);
           return await this.tryBrowserFallback(method, url, headers, body);
         }
@@ -469,7 +621,10 @@ export class HttpClient {
     if (this.curlCffiClient) {
       try {
         this.opts.logger.debug(`Using curl_cffi for ${method} ${url}`);
-        const result = await this.curlCffiClient.request(requestData);
+        const curlCffiClient = this.curlCffiClient;
+        const result = await this.runBypassEngine("curl_cffi", url, () =>
+          curlCffiClient.request({ ...requestData, profile: this.bypassProfiles.curl_cffi })
+        );
 
         if (!result.success) {
           throw new Error(`curl_cffi error: ${result.error} (${result.error_type})`);
@@ -484,14 +639,18 @@ export class HttpClient {
             this.opts.logger.debug(`Stored cookie from curl_cffi: ${key}`);
           });
         }
+        this.rememberSession(result);
 
         // Update last URL for Referer header
         this.lastUrl = url;
 
         // Check for HTTP errors / Cloudflare challenge
         if (result.status && result.status >= 400) {
-          const isChallenge = this.isCloudflareChallenge(result.status, result.body, result.headers);
-          if (isChallenge && this.browserFallbackClient?.isEnabled()) {
+          const isChallenge = this.isUnresolvedChallenge(result);
+          if (isChallenge) {
+            this.metrics.recordEvent(url, "cloudflare_challenge");
+          }
+          if (isChallenge && this.canUseBrowserFallback()) {
             this.opts.logger.info(`Cloudflare challenge detected via curl_cffi (${result.status}), switching to browser fallback`);
             return await this.tryBrowserFallback(method, url, headers, body);
           }
@@ -501,7 +660,11 @@ export class HttpClient {
           throw new HttpError(result.status, `HTTP ${result.status}`, errorBody);
         }
 
-        if (this.isCloudflareChallenge(result.status, result.body, result.headers) && this.browserFallbackClient?.isEnabled()) {
+        const isChallengePage = this.isUnresolvedChallenge(result);
+        if (isChallengePage) {
+          this.metrics.recordEvent(url, "cloudflare_challenge");
+        }
+        if (isChallengePage && this.canUseBrowserFallback()) {
           this.opts.logger.info(`Cloudflare challenge page detected via curl_cffi (${result.status}), switching to browser fallback`);
           return await this.tryBrowserFallback(method, url, headers, body);
         }
@@ -538,7 +701,137 @@ export class HttpClient {
     throw new Error("No bypass method available");
   }
 
+  private async runBypassEngine<
+    T extends { success: boolean; status?: number; events?: Record<string, number>; challenge?: ChallengeReport }
+  >(
+    engine: Engine,
+    url: string,
+    run: () => Promise<T>
+  ): Promise<T> {
+    const startedAt = Date.now();
+    const end = this.metrics.begin(engine);
+    try {
+      const result = await run();
+      this.metrics.recordRequest(url, engine, Date.now() - startedAt, result.success && (result.status ?? 0) < 400);
+      for (const [name, count] of Object.entries(result.events ?? {})) {
+        const event = WRAPPER_EVENTS[name];
+        if (event && typeof count === "number") this.metrics.recordEvent(url, event, count);
+      }
+      // Keep using the profile that got past the challenge so the next spawn starts with it
+      if (result.challenge?.resolved && result.challenge.profile) {
+        this.opts.logger.info(`Cloudflare challenge resolved in ${engine} with profile ${result.challenge.profile}`);
+        this.bypassProfiles[engine] = result.challenge.profile;
+      }
+      return result;
+    } catch (e) {
+      this.metrics.recordRequest(url, engine, Date.now() - startedAt, false);
+      throw e;
+    } finally {
+      end();
+    }
+  }
+
+  // Track cookie expiry, and count an authenticated response as a session check
+  private rememberSession(result: { status?: number; cookies?: Record<string, string>; cookie_expiry?: Record<string, number> }) {
+    for (const [name, seconds] of Object.entries(result.cookie_expiry ?? {})) {
+      if (typeof seconds === "number") this.cookieExpiry.set(name, seconds * 1000);
+    }
+    if (result.status !== undefined && result.status < 400 && result.cookies?._t) {
+      this.lastSessionCheckAt = Date.now();
+    }
+    this.startKeepAlive();
+  }
+
+  private forgetCookies(names: string[]) {
+    for (const name of names) {
+      this.cookies.delete(name);
+      this.cookieExpiry.delete(name);
+    }
+  }
+
+  private needsSessionRenewal(now: number): boolean {
+    // Periodic validation only matters when there is a login to restore
+    if (this.opts.loginCredentials && now - this.lastSessionCheckAt >= (this.opts.keepAliveIntervalMs ?? 0)) return true;
+    return RENEWABLE_COOKIES.some((name) => {
+      const expiresAt = this.cookieExpiry.get(name);
+      return expiresAt !== undefined && expiresAt - now <= RENEW_BEFORE_MS;
+    });
+  }
+
+  /**
+   * Validate the session with a cheap background request, renewing cookies that
+   * are about to lapse and logging in again if Discourse dropped the session.
+   */
+  async keepAlive(): Promise<void> {
+    if (this.keepAliveInFlight) return this.keepAliveInFlight;
+    this.keepAliveInFlight = this.renewSession().finally(() => {
+      this.keepAliveInFlight = undefined;
+    });
+    return this.keepAliveInFlight;
+  }
+
+  getSessionHealth(): SessionHealth {
+    const cookieExpiry: Record<string, string> = {};
+    for (const name of RENEWABLE_COOKIES) {
+      const expiresAt = this.cookieExpiry.get(name);
+      if (expiresAt !== undefined) cookieExpiry[name] = new Date(expiresAt).toISOString();
+    }
+    return { ...this.sessionHealth, cookie_expiry: cookieExpiry };
+  }
+
+  private async renewSession(): Promise<void> {
+    const now = Date.now();
+    const url = new URL("/session/current.json", this.base).toString();
+    this.lastSessionCheckAt = now;
+    this.sessionHealth.last_check_at = new Date(now).toISOString();
+    this.metrics.recordEvent(url, "keepalive");
+
+    // Drop cookies about to lapse; the next wrapper run warms up or logs in again
+    for (const name of RENEWABLE_COOKIES) {
+      const expiresAt = this.cookieExpiry.get(name);
+      if (expiresAt !== undefined && expiresAt - now <= RENEW_BEFORE_MS) {
+        this.opts.logger.info(`Session keep-alive: renewing ${name} before it expires`);
+        this.forgetCookies(name === "_t" ? LOGIN_COOKIES : [name]);
+      }
+    }
+
+    try {
+      const loggedIn = await this.probeSession();
+      if (!loggedIn && this.opts.loginCredentials) {
+        this.opts.logger.info("Session keep-alive: Discourse session expired, logging in again");
+        this.forgetCookies(LOGIN_COOKIES);
+        if (!(await this.probeSession())) {
+          throw new Error("still not logged in after re-login");
+        }
+      }
+      this.sessionHealth.last_success_at = new Date().toISOString();
+      this.sessionHealth.last_error = undefined;
+      this.sessionHealth.consecutive_failures = 0;
+    } catch (e: any) {
+      const msg = e?.message || String(e);
+      this.sessionHealth.last_error = msg;
+      this.sessionHealth.consecutive_failures++;
+      this.metrics.recordEvent(url, "keepalive_failure");
+      this.opts.logger.error(`Session keep-alive failed for ${this.base.origin} (${this.sessionHealth.consecutive_failures} in a row): ${msg}`);
+    }
+  }
+
+  // True when /session/current.json reports a logged-in user; Discourse answers 404 otherwise
+  private async probeSession(): Promise<boolean> {
+    try {
+      const data = await this.request("GET", "/session/current.json", undefined, { priority: "background" });
+      return Boolean(data?.current_user);
+    } catch (e) {
+      if (e instanceof HttpError && e.status === 404) return false;
+      throw e;
+    }
+  }
+
   async dispose(): Promise<void> {
+    if (this.keepAliveTimer) {
+      clearInterval(this.keepAliveTimer);
+      this.keepAliveTimer = undefined;
+    }
     if (!this.browserFallbackClient) return;
     try {
       await this.browserFallbackClient.dispose();
@@ -7,9 +7,13 @@ Supports session persistence and login functionality.
 
 import sys
 import json
+import time
 import cloudscraper
 from typing import Dict, Optional
 
+from cassette import record_exchange, replay_exchange
+from challenge import FINGERPRINT_COOKIES, is_challenge, next_profile
+
 # Try to import brotli for decompression support
 try:
     import brotli
@@ -25,29 +29,52 @@ except ImportError:
 # Global scraper instance to maintain session across requests
 _scraper_instance: Optional[cloudscraper.CloudScraper] = None
 _base_url: Optional[str] = None
+_profile: Optional[str] = None
+
+# Browser profiles, in the order they are tried after a challenge
+PROFILES = ["chrome", "firefox"]
+
+# Per-process counters reported back to Node.js with every response
+_events: Dict[str, int] = {
+    "warmup": 0,
+    "login": 0,
+    "csrf_fetch": 0,
+    "challenge_retry": 0,
+    "challenge_resolved": 0,
+}
+
 
+def count_event(name: str) -> None:
+    """Increment a per-process event counter."""
+    _events[name] = _events.get(name, 0) + 1
 
-def get_scraper(base_url: str) -> cloudscraper.CloudScraper:
+
+def get_scraper(
+    base_url: str, warm_up: bool = True, profile: str = PROFILES[0]
+) -> cloudscraper.CloudScraper:
     """Get or create a cloudscraper instance with session persistence."""
-    global _scraper_instance, _base_url
+    global _scraper_instance, _base_url, _profile
 
-    # Create new scraper if URL changed or doesn't exist
-    if _scraper_instance is None or _base_url != base_url:
+    # Create new scraper if URL or browser profile changed or doesn't exist
+    if _scraper_instance is None or _base_url != base_url or _profile != profile:
         _scraper_instance = cloudscraper.create_scraper(
             browser={
-                "browser": "chrome",
+                "browser": profile,
                 "platform": "windows",
                 "mobile": False,
                 "desktop": True,
             }
         )
         _base_url = base_url
+        _profile = profile
 
         # Warm up session with base URL
-        try:
-            _scraper_instance.get(base_url, timeout=10, allow_redirects=True)
-        except Exception:
-            pass  # Ignore warm-up errors
+        if warm_up:
+            count_event("warmup")
+            try:
+                _scraper_instance.get(base_url, timeout=10, allow_redirects=True)
+            except Exception:
+                pass  # Ignore warm-up errors
 
     return _scraper_instance
 
@@ -56,6 +83,7 @@ def fetch_csrf_token(
     scraper: cloudscraper.CloudScraper, base_url: str
 ) -> Optional[str]:
     """Fetch CSRF token from /session/csrf.json."""
+    count_event("csrf_fetch")
     try:
         response = scraper.get(
             f"{base_url}/session/csrf.json",
@@ -106,6 +134,7 @@ def login(
     second_factor_token: Optional[str] = None,
 ) -> Dict:
     """Login to Discourse forum."""
+    count_event("login")
     try:
         # Get CSRF token first
         csrf_token = fetch_csrf_token(scraper, base_url)
@@ -160,6 +189,77 @@ def login(
         }
 
 
+def read_body(response) -> str:
+    """Decode a response body as text, handling Brotli and odd encodings."""
+    # Ensure body is properly decoded as text
+    # The requests library should auto-decode gzip, but let's ensure it
+    try:
+        content_encoding = response.headers.get("Content-Encoding", "").lower()
+
+        # If brotli compressed and we have the library, decompress manually
+        if content_encoding == "br" and HAS_BROTLI:
+            print(f"[DEBUG] Manually decompressing Brotli content", file=sys.stderr)
+            decompressed = brotli.decompress(response.content)
+            body_text = decompressed.decode("utf-8", errors="replace")
+        else:
+            # Force encoding detection if not set
+            if response.encoding is None or response.encoding == "ISO-8859-1":
+                # Try to detect from content-type or default to utf-8
+                response.encoding = response.apparent_encoding or "utf-8"
+
+            # Get the text content - this should handle gzip automatically
+            body_text = response.text
+
+        # Verify it's actually decoded
+        print(f"[DEBUG] Response encoding: {response.encoding}", file=sys.stderr)
+        print(
+            f"[DEBUG] Content-Encoding header: {response.headers.get('Content-Encoding', 'none')}",
+            file=sys.stderr,
+        )
+        print(
+            f"[DEBUG] Response body length: {len(body_text)} chars", file=sys.stderr
+        )
+        print(
+            f"[DEBUG] Response body preview (first 200 chars): {body_text[:200]}",
+            file=sys.stderr,
+        )
+
+        # Check if body looks like JSON
+        if body_text.strip().startswith("{") or body_text.strip().startswith("["):
+            print(f"[DEBUG] Body appears to be JSON", file=sys.stderr)
+        else:
+            print(
+                f"[DEBUG] WARNING: Body does not appear to be JSON!",
+                file=sys.stderr,
+            )
+            print(
+                f"[DEBUG] First bytes as hex: {body_text[:50].encode('latin1', errors='ignore').hex()}",
+                file=sys.stderr,
+            )
+
+    except Exception as e:
+        print(f"[DEBUG] Failed to decode response body: {e}", file=sys.stderr)
+        import traceback
+
+        traceback.print_exc(file=sys.stderr)
+        # Fallback: try to decode as utf-8
+        return response.content.decode("utf-8", errors="replace")
+
+    return body_text
+
+
+def send(scraper: cloudscraper.CloudScraper, data: Dict):
+    """Send the caller's request on a scraper; returns (response, body_text)."""
+    response = scraper.request(
+        method=data["method"],
+        url=data["url"],
+        headers=data.get("headers", {}),
+        data=data.get("body"),
+        timeout=data.get("timeout", 30),
+    )
+    return response, read_body(response)
+
+
 def make_request(data: Dict) -> Dict:
     """
     Make an HTTP request using cloudscraper.
@@ -173,6 +273,9 @@ def make_request(data: Dict) -> Dict:
             - cookies: Optional dict of cookies
             - timeout: Optional timeout in seconds
             - login: Optional dict with 'username' and 'password' for authentication
+            - cassette: Optional dict with 'mode' ('record' or 'replay'), 'path' and
+              'latency' ('recorded', 'none' or milliseconds) for offline runs
+            - profile: Optional browser profile (defaults to chrome)
 
     Returns:
         Dictionary containing:
@@ -181,12 +284,23 @@ def make_request(data: Dict) -> Dict:
             - body: Response body (text)
             - cookies: Response cookies
             - csrf_token: CSRF token if available
+            - challenge: Whether a Cloudflare challenge was detected, retried with
+              another profile and resolved, and the profile that produced the response
     """
     # Extract base URL for session management
     url = data["url"]
     base_url = "/".join(url.split("/")[:3])  # Extract scheme://host
 
-    scraper = get_scraper(base_url)
+    # Replay mode serves recorded responses without warm-up, login or network
+    cassette = data.get("cassette") or {}
+    if cassette.get("mode") == "replay":
+        return replay_exchange(cassette, data)
+
+    # A cf_clearance cookie from an earlier request (or the Node.js keep-alive)
+    # already proves the challenge was passed, so skip the warm-up round trip
+    has_clearance = "cf_clearance" in (data.get("cookies") or {})
+    profile = data.get("profile") or PROFILES[0]
+    scraper = get_scraper(base_url, warm_up=not has_clearance, profile=profile)
 
     # Set cookies if provided (these may include session cookies from previous requests)
     if data.get("cookies"):
@@ -238,17 +352,51 @@ def make_request(data: Dict) -> Dict:
 
     try:
         # Make the request
-        response = scraper.request(
-            method=data["method"],
-            url=data["url"],
-            headers=data.get("headers", {}),
-            data=data.get("body"),
-            timeout=data.get("timeout", 30),
-        )
+        started_at = time.monotonic()
+        response, body_text = send(scraper, data)
+
+        # Retry a challenge once in this process with the next profile and a
+        # fresh warm-up, instead of escalating to curl_cffi or a browser
+        challenge = {
+            "detected": False,
+            "retried": False,
+            "resolved": False,
+            "profile": profile,
+        }
+        if is_challenge(response.status_code, response.headers, body_text):
+            challenge["detected"] = True
+            profile = next_profile(PROFILES, profile)
+            count_event("challenge_retry")
+            print(
+                f"[WARNING] Cloudflare challenge (HTTP {response.status_code}), retrying as {profile}",
+                file=sys.stderr,
+            )
+            print(
+                f"[WARNING] 检测到 Cloudflare 挑战（HTTP {response.status_code}），改用 {profile} 重试",
+                file=sys.stderr,
+            )
+            # Keep the forum session, drop cookies tied to the old fingerprint
+            carried = {
+                k: v for k, v in scraper.cookies.items() if k not in FINGERPRINT_COOKIES
+            }
+            csrf_header = scraper.headers.get("X-CSRF-Token")
+            scraper = get_scraper(base_url, profile=profile)
+            scraper.cookies.update(carried)
+            if csrf_header:
+                scraper.headers["X-CSRF-Token"] = csrf_header
+            response, body_text = send(scraper, data)
+            challenge["retried"] = True
+            challenge["profile"] = profile
+            challenge["resolved"] = not is_challenge(
+                response.status_code, response.headers, body_text
+            )
+            if challenge["resolved"]:
+                count_event("challenge_resolved")
 
         # Extract ALL cookies from scraper session (not just response cookies)
         # This includes cf_clearance and other Cloudflare cookies
         cookies = {key: value for key, value in scraper.cookies.items()}
+        cookie_expiry = {c.name: c.expires for c in scraper.cookies if c.expires}
         print(
             f"[DEBUG] Returning {len(cookies)} cookies to Node.js: {list(cookies.keys())}",
             file=sys.stderr,
@@ -257,70 +405,23 @@ def make_request(data: Dict) -> Dict:
         # Get CSRF token if available
         csrf_token = scraper.headers.get("X-CSRF-Token")
 
-        # Ensure body is properly decoded as text
-        # The requests library should auto-decode gzip, but let's ensure it
-        try:
-            content_encoding = response.headers.get("Content-Encoding", "").lower()
-
-            # If brotli compressed and we have the library, decompress manually
-            if content_encoding == "br" and HAS_BROTLI:
-                print(f"[DEBUG] Manually decompressing Brotli content", file=sys.stderr)
-                decompressed = brotli.decompress(response.content)
-                body_text = decompressed.decode("utf-8", errors="replace")
-            else:
-                # Force encoding detection if not set
-                if response.encoding is None or response.encoding == "ISO-8859-1":
-                    # Try to detect from content-type or default to utf-8
-                    response.encoding = response.apparent_encoding or "utf-8"
-
-                # Get the text content - this should handle gzip automatically
-                body_text = response.text
-
-            # Verify it's actually decoded
-            print(f"[DEBUG] Response encoding: {response.encoding}", file=sys.stderr)
-            print(
-                f"[DEBUG] Content-Encoding header: {response.headers.get('Content-Encoding', 'none')}",
-                file=sys.stderr,
-            )
-            print(
-                f"[DEBUG] Response body length: {len(body_text)} chars", file=sys.stderr
-            )
-            print(
-                f"[DEBUG] Response body preview (first 200 chars): {body_text[:200]}",
-                file=sys.stderr,
-            )
-
-            # Check if body looks like JSON
-            if body_text.strip().startswith("{") or body_text.strip().startswith("["):
-                print(f"[DEBUG] Body appears to be JSON", file=sys.stderr)
-            else:
-                print(
-                    f"[DEBUG] WARNING: Body does not appear to be JSON!",
-                    file=sys.stderr,
-                )
-                print(
-                    f"[DEBUG] First bytes as hex: {body_text[:50].encode('latin1', errors='ignore').hex()}",
-                    file=sys.stderr,
-                )
-
-        except Exception as e:
-            print(f"[DEBUG] Failed to decode response body: {e}", file=sys.stderr)
-            import traceback
-
-            traceback.print_exc(file=sys.stderr)
-            # Fallback: try to decode as utf-8
-            body_text = response.content.decode("utf-8", errors="replace")
-
         # Return response data
-        return {
+        result = {
             "success": True,
             "status": response.status_code,
             "headers": dict(response.headers),
             "body": body_text,
             "cookies": cookies,
+            "cookie_expiry": cookie_expiry,  # Epoch seconds, for proactive renewal
             "csrf_token": csrf_token,
             "logged_in": should_login,  # Indicate if we just logged in
+            "challenge": challenge,
         }
+        if cassette.get("mode") == "record":
+            record_exchange(
+                cassette, data, result, (time.monotonic() - started_at) * 1000
+            )
+        return result
 
     except Exception as e:
         return {"success": False, "error": str(e), "error_type": type(e).__name__}
@@ -336,6 +437,7 @@ def main():
         result = make_request(input_data)
 
         # Write result to stdout with explicit encoding
+        result["events"] = dict(_events)
         output = json.dumps(result, ensure_ascii=True)
         sys.stdout.write(output)
         sys.stdout.flush()
@@ -347,6 +449,7 @@ def main():
             "error": f"Invalid JSON input: {str(e)}",
             "error_type": "JSONDecodeError",
         }
+        error_result["events"] = dict(_events)
         output = json.dumps(error_result, ensure_ascii=True)
         sys.stdout.write(output)
         sys.stdout.flush()
@@ -358,6 +461,7 @@ def main():
             "error": str(e),
             "error_type": type(e).__name__,
         }
+        error_result["events"] = dict(_events)
         output = json.dumps(error_result, ensure_ascii=True)
         sys.stdout.write(output)
         sys.stdout.flush()
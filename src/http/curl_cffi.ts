@@ -3,6 +3,7 @@ import { fileURLToPath } from "node:url";
 import { dirname, join } from "node:path";
 import { existsSync } from "node:fs";
 import type { Logger } from "../util/logger.js";
+import type { CassetteOptions, ChallengeReport } from "./client.js";
 
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = dirname(__filename);
@@ -51,6 +52,8 @@ export interface CurlCffiRequest {
     password: string;
     second_factor_token?: string;
   };
+  cassette?: CassetteOptions;
+  profile?: string; // Browser profile that last passed a challenge
 }
 
 export interface CurlCffiResponse {
@@ -59,10 +62,13 @@ export interface CurlCffiResponse {
   headers?: Record<string, string>;
   body?: string;
   cookies?: Record<string, string>;
+  cookie_expiry?: Record<string, number>; // Cookie name -> expiry (epoch seconds)
+  challenge?: ChallengeReport;
   csrf_token?: string;
   message?: string;
   error?: string;
   error_type?: string;
+  events?: Record<string, number>; // Per-process warm-up/login/CSRF counters
 }
 
 export class CurlCffiClient {
@@ -0,0 +1,250 @@
+export type Engine = "cloudscraper" | "curl_cffi" | "fetch" | "browser";
+
+export type MetricEvent =
+  | "warmup"
+  | "login"
+  | "csrf_fetch"
+  | "cloudflare_challenge"
+  | "challenge_retry"
+  | "challenge_resolved"
+  | "browser_fallback"
+  | "cache_hit"
+  | "cache_miss"
+  | "keepalive"
+  | "keepalive_failure";
+
+// Upper bounds (ms) for latency buckets; a final +Inf bucket is implied
+const LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000];
+
+class Histogram {
+  counts = new Array<number>(LATENCY_BUCKETS_MS.length + 1).fill(0);
+  sum = 0;
+  count = 0;
+
+  observe(ms: number) {
+    let i = LATENCY_BUCKETS_MS.findIndex((le) => ms <= le);
+    if (i === -1) i = LATENCY_BUCKETS_MS.length;
+    this.counts[i]++;
+    this.sum += ms;
+    this.count++;
+  }
+
+  merge(other: Histogram) {
+    for (let i = 0; i < this.counts.length; i++) this.counts[i] += other.counts[i];
+    this.sum += other.sum;
+    this.count += other.count;
+  }
+
+  // Approximate quantile: upper bound of the bucket holding the q-th observation
+  quantile(q: number): number | undefined {
+    if (this.count === 0) return undefined;
+    const target = Math.ceil(this.count * q);
+    let seen = 0;
+    for (let i = 0; i < this.counts.length; i++) {
+      seen += this.counts[i];
+      if (seen >= target) return LATENCY_BUCKETS_MS[i] ?? Infinity;
+    }
+    return Infinity;
+  }
+
+  toJSON() {
+    const buckets: Record<string, number> = {};
+    let cumulative = 0;
+    LATENCY_BUCKETS_MS.forEach((le, i) => {
+      cumulative += this.counts[i];
+      buckets[String(le)] = cumulative;
+    });
+    buckets["+Inf"] = this.count;
+    return {
+      count: this.count,
+      sum_ms: Math.round(this.sum),
+      avg_ms: this.count ? Math.round(this.sum / this.count) : 0,
+      p50_ms: this.quantile(0.5),
+      p99_ms: this.quantile(0.99),
+      buckets,
+    };
+  }
+}
+
+type Series = { host: string; endpoint: string; engine: Engine; requests: number; errors: number; latency: Histogram };
+
+/**
+ * Collapse a request URL into an endpoint class so ids and slugs do not
+ * explode the series count, e.g. /t/some-slug/123.json -> /t/:slug/:id.json
+ */
+export function endpointClass(url: string): string {
+  let pathname: string;
+  try {
+    pathname = new URL(url).pathname;
+  } catch {
+    pathname = url.split("?")[0];
+  }
+  const segments = pathname.split("/");
+  const out = segments.map((seg) => (/^\d+(\.\w+)?$/.test(seg) ? seg.replace(/^\d+/, ":id") : seg));
+  if ((out[1] === "t" || out[1] === "c") && out.length > 3 && !out[2].startsWith(":")) out[2] = ":slug";
+  if (out[1] === "u" && out.length > 2) out[2] = out[2].endsWith(".json") ? ":username.json" : ":username";
+  return out.join("/") || "/";
+}
+
+function hostOf(url: string): string {
+  try {
+    return new URL(url).host;
+  } catch {
+    return "unknown";
+  }
+}
+
+function escapeLabel(value: string): string {
+  return value.replace(/\\/g, "\\\\").replace(/"/g, '\\"').replace(/\n/g, "\\n");
+}
+
+function labels(obj: Record<string, string>): string {
+  const parts = Object.entries(obj).map(([k, v]) => `${k}="${escapeLabel(v)}"`);
+  return parts.length ? `{${parts.join(",")}}` : "";
+}
+
+/**
+ * Process-wide counters for the HTTP/bypass layer. One instance is shared by
+ * every HttpClient built from the same SiteState.
+ */
+export class HttpMetrics {
+  private readonly startedAt = Date.now();
+  private series = new Map<string, Series>();
+  private events = new Map<string, Map<MetricEvent, number>>();
+  private inFlight = new Map<Engine, number>();
+  private gauges = new Map<string, { help: string; read: () => number }>();
+
+  recordRequest(url: string, engine: Engine, durationMs: number, ok: boolean) {
+    const host = hostOf(url);
+    const endpoint = endpointClass(url);
+    const key = `${host} ${endpoint} ${engine}`;
+    let s = this.series.get(key);
+    if (!s) {
+      s = { host, endpoint, engine, requests: 0, errors: 0, latency: new Histogram() };
+      this.series.set(key, s);
+    }
+    s.requests++;
+    if (!ok) s.errors++;
+    s.latency.observe(durationMs);
+  }
+
+  recordEvent(url: string, event: MetricEvent, count = 1) {
+    if (count <= 0) return;
+    const host = hostOf(url);
+    let perHost = this.events.get(host);
+    if (!perHost) {
+      perHost = new Map();
+      this.events.set(host, perHost);
+    }
+    perHost.set(event, (perHost.get(event) ?? 0) + count);
+  }
+
+  // Track an in-flight request on an engine; returns a function that ends it
+  begin(engine: Engine): () => void {
+    this.inFlight.set(engine, (this.inFlight.get(engine) ?? 0) + 1);
+    let ended = false;
+    return () => {
+      if (ended) return;
+      ended = true;
+      this.inFlight.set(engine, Math.max(0, (this.inFlight.get(engine) ?? 1) - 1));
+    };
+  }
+
+  registerGauge(name: string, help: string, read: () => number) {
+    this.gauges.set(name, { help, read });
+  }
+
+  snapshot() {
+    const byHost = new Map<string, { requests: number; errors: number; latency: Histogram }>();
+    const byEndpoint = new Map<string, { requests: number; errors: number; latency: Histogram }>();
+    const byEngine = new Map<string, { requests: number; errors: number; latency: Histogram }>();
+    const add = (map: typeof byHost, key: string, s: Series) => {
+      let agg = map.get(key);
+      if (!agg) {
+        agg = { requests: 0, errors: 0, latency: new Histogram() };
+        map.set(key, agg);
+      }
+      agg.requests += s.requests;
+      agg.errors += s.errors;
+      agg.latency.merge(s.latency);
+    };
+    for (const s of this.series.values()) {
+      add(byHost, s.host, s);
+      add(byEndpoint, s.endpoint, s);
+      add(byEngine, s.engine, s);
+    }
+    const toObj = (map: typeof byHost) =>
+      Object.fromEntries(
+        Array.from(map.entries()).map(([k, v]) => [k, { requests: v.requests, errors: v.errors, latency: v.latency.toJSON() }])
+      );
+
+    const events: Record<string, Record<string, number>> = {};
+    for (const [host, perHost] of this.events) events[host] = Object.fromEntries(perHost);
+
+    const gauges: Record<string, number> = {};
+    for (const [name, g] of this.gauges) gauges[name] = g.read();
+
+    return {
+      uptime_seconds: Math.floor((Date.now() - this.startedAt) / 1000),
+      by_host: toObj(byHost),
+      by_endpoint: toObj(byEndpoint),
+      by_engine: toObj(byEngine),
+      events,
+      in_flight: Object.fromEntries(this.inFlight),
+      gauges,
+    };
+  }
+
+  toPrometheus(): string {
+    const lines: string[] = [];
+    const series = Array.from(this.series.values());
+
+    lines.push("# HELP nitan_http_requests_total Upstream requests by host, endpoint class and engine.");
+    lines.push("# TYPE nitan_http_requests_total counter");
+    for (const s of series) {
+      lines.push(`nitan_http_requests_total${labels({ host: s.host, endpoint: s.endpoint, engine: s.engine })} ${s.requests}`);
+    }
+
+    lines.push("# HELP nitan_http_request_errors_total Failed upstream requests by host, endpoint class and engine.");
+    lines.push("# TYPE nitan_http_request_errors_total counter");
+    for (const s of series) {
+      lines.push(`nitan_http_request_errors_total${labels({ host: s.host, endpoint: s.endpoint, engine: s.engine })} ${s.errors}`);
+    }
+
+    lines.push("# HELP nitan_http_request_duration_ms Upstream request latency in milliseconds.");
+    lines.push("# TYPE nitan_http_request_duration_ms histogram");
+    for (const s of series) {
+      const base = { host: s.host, endpoint: s.endpoint, engine: s.engine };
+      let cumulative = 0;
+      LATENCY_BUCKETS_MS.forEach((le, i) => {
+        cumulative += s.latency.counts[i];
+        lines.push(`nitan_http_request_duration_ms_bucket${labels({ ...base, le: String(le) })} ${cumulative}`);
+      });
+      lines.push(`nitan_http_request_duration_ms_bucket${labels({ ...base, le: "+Inf" })} ${s.latency.count}`);
+      lines.push(`nitan_http_request_duration_ms_sum${labels(base)} ${Math.round(s.latency.sum)}`);
+      lines.push(`nitan_http_request_duration_ms_count${labels(base)} ${s.latency.count}`);
+    }
+
+    lines.push("# HELP nitan_http_events_total Warm-ups, logins, CSRF fetches, challenges, fallbacks and cache lookups.");
+    lines.push("# TYPE nitan_http_events_total counter");
+    for (const [host, perHost] of this.events) {
+      for (const [event, count] of perHost) {
+        lines.push(`nitan_http_events_total${labels({ host, event })} ${count}`);
+      }
+    }
+
+    lines.push("# HELP nitan_http_in_flight Requests currently running per engine.");
+    lines.push("# TYPE nitan_http_in_flight gauge");
+    for (const [engine, count] of this.inFlight) {
+      lines.push(`nitan_http_in_flight${labels({ engine })} ${count}`);
+    }
+
+    for (const [name, g] of this.gauges) {
+      lines.push(`# HELP nitan_${name} ${g.help}`);
+      lines.push(`# TYPE nitan_${name} gauge`);
+      lines.push(`nitan_${name} ${g.read()}`);
+    }
+
+    return lines.join("\n") + "\n";
+  }
+}
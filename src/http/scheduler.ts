@@ -0,0 +1,106 @@
+export type RequestPriority = "interactive" | "background";
+
+type Job = { run: () => void };
+
+type HostState = {
+  running: Record<RequestPriority, number>;
+  queues: Record<RequestPriority, Job[]>;
+};
+
+/**
+ * Per-host request scheduler with two priority classes.
+ *
+ * Interactive requests (MCP tool calls) are always dispatched first. Background
+ * work (prefetch, content fan-out, keep-alive) only runs on leftover capacity
+ * and never takes the last free slot, so an interactive request arriving while
+ * background work is in flight can start immediately. With a capacity of 1
+ * there is no spare slot: background work then only runs while the host is
+ * idle, and an interactive request arriving meanwhile waits for it to finish.
+ *
+ * A queued job whose AbortSignal fires is dropped without ever taking a slot.
+ */
+export class RequestScheduler {
+  private hosts = new Map<string, HostState>();
+  private readonly capacity: number;
+  private readonly backgroundLimit: number;
+
+  constructor(capacity = 4) {
+    this.capacity = Math.max(1, Math.floor(capacity));
+    // Keep one slot free for interactive work; 0 means "only while idle"
+    this.backgroundLimit = this.capacity - 1;
+  }
+
+  run<T>(host: string, priority: RequestPriority, task: () => Promise<T>, signal?: AbortSignal): Promise<T> {
+    if (signal?.aborted) return Promise.reject(signal.reason ?? new Error("Aborted"));
+    const state = this.stateFor(host);
+    return new Promise<T>((resolve, reject) => {
+      const onAbort = () => {
+        const queue = state.queues[priority];
+        const index = queue.indexOf(job);
+        if (index !== -1) queue.splice(index, 1);
+        reject(signal?.reason ?? new Error("Aborted"));
+      };
+      const job: Job = {
+        run: () => {
+          signal?.removeEventListener("abort", onAbort);
+          state.running[priority]++;
+          let settled: Promise<T>;
+          try {
+            settled = Promise.resolve(task());
+          } catch (e) {
+            settled = Promise.reject(e);
+          }
+          settled.then(resolve, reject).finally(() => {
+            state.running[priority]--;
+            this.dispatch(state);
+          });
+        },
+      };
+      signal?.addEventListener("abort", onAbort, { once: true });
+      state.queues[priority].push(job);
+      this.dispatch(state);
+    });
+  }
+
+  stats(): { running: Record<RequestPriority, number>; queued: Record<RequestPriority, number> } {
+    const out = {
+      running: { interactive: 0, background: 0 },
+      queued: { interactive: 0, background: 0 },
+    };
+    for (const state of this.hosts.values()) {
+      out.running.interactive += state.running.interactive;
+      out.running.background += state.running.background;
+      out.queued.interactive += state.queues.interactive.length;
+      out.queued.background += state.queues.background.length;
+    }
+    return out;
+  }
+
+  private stateFor(host: string): HostState {
+    let state = this.hosts.get(host);
+    if (!state) {
+      state = {
+        running: { interactive: 0, background: 0 },
+        queues: { interactive: [], background: [] },
+      };
+      this.hosts.set(host, state);
+    }
+    return state;
+  }
+
+  private dispatch(state: HostState) {
+    while (state.running.interactive + state.running.background < this.capacity) {
+      const interactive = state.queues.interactive.shift();
+      if (interactive) {
+        interactive.run();
+        continue;
+      }
+      // Background never takes the last free slot, except on an idle single-slot host
+      const idle = state.running.interactive + state.running.background === 0;
+      if (state.running.background >= this.backgroundLimit && !idle) return;
+      const background = state.queues.background.shift();
+      if (!background) return;
+      background.run();
+    }
+  }
+}
@@ -14,6 +14,7 @@ if (majorVersion < 18) {
 
 import { readFile, writeFile } from "node:fs/promises";
 import { existsSync } from "node:fs";
+import { resolve as resolvePath } from "node:path";
 import { createServer } from "node:http";
 import { spawn } from "node:child_process";
 import { fileURLToPath } from "node:url";
@@ -94,6 +95,14 @@ const ProfileSchema = z
     login_wait_timeout_ms: z.number().int().positive().optional().default(180000),
     login_check_url: z.string().url().optional(),
     skip_site_validation: z.boolean().optional().default(false).describe("Skip --site pre-validation (useful for tests)"),
+    keepalive_interval_ms: z.number().int().nonnegative().optional().default(600000).describe("Validate and renew the forum session in the background this often when logged in; expiring Cloudflare clearance is renewed too; 0 disables (set via --keepalive-interval-ms)"),
+    cassette_mode: z.enum(["off", "record", "replay"]).optional().default("off").describe("Record bypass traffic to a cassette file, or replay it offline (set via --cassette-mode)"),
+    cassette_path: z.string().optional().describe("Cassette file (JSON Lines) used by --cassette-mode"),
+    cassette_latency: z
+      .union([z.enum(["recorded", "none"]), z.number().int().nonnegative()])
+      .optional()
+      .default("recorded")
+      .describe("Replay delay: 'recorded' timings, 'none', or a fixed number of milliseconds"),
   })
   .strict();
 
@@ -229,6 +238,10 @@ function mergeConfig(profile: Partial<Profile>, flags: Record<string, unknown>):
     login_wait_timeout_ms: (((flags.login_wait_timeout_ms ?? flags["login-wait-timeout-ms"]) as number | undefined) ?? profile.login_wait_timeout_ms ?? 180000) as number,
     login_check_url: (((flags.login_check_url ?? flags["login-check-url"]) as string | undefined) ?? profile.login_check_url) as string | undefined,
     skip_site_validation: (((flags.skip_site_validation ?? flags["skip-site-validation"]) as boolean | undefined) ?? profile.skip_site_validation ?? false) as boolean,
+    keepalive_interval_ms: (((flags.keepalive_interval_ms ?? flags["keepalive-interval-ms"]) as number | undefined) ?? profile.keepalive_interval_ms ?? 600000) as number,
+    cassette_mode: (((flags.cassette_mode ?? flags["cassette-mode"]) as "off" | "record" | "replay" | undefined) ?? profile.cassette_mode ?? "off") as "off" | "record" | "replay",
+    cassette_path: (((flags.cassette_path ?? flags["cassette-path"]) as string | undefined) ?? profile.cassette_path) as string | undefined,
+    cassette_latency: (((flags.cassette_latency ?? flags["cassette-latency"]) as "recorded" | "none" | number | undefined) ?? profile.cassette_latency ?? "recorded") as "recorded" | "none" | number,
   } satisfies Profile;
   
   const result = ProfileSchema.safeParse(merged);
@@ -534,6 +547,13 @@ Options:
     logger.info("Browser fallback is disabled on non-macOS platforms; using direct bypass only.");
   }
 
+  if (config.cassette_mode !== "off" && !config.cassette_path) {
+    throw new Error(`--cassette-mode ${config.cassette_mode} requires --cassette-path`);
+  }
+  if (config.cassette_mode !== "off") {
+    logger.info(`Cassette ${config.cassette_mode} mode: ${config.cassette_path}`);
+  }
+
   const siteState = new SiteState({
     logger,
     timeoutMs: config.timeout_ms,
@@ -541,6 +561,8 @@ Options:
     authOverrides,
     bypassMethod: config.use_cloudscraper ? "both" : config.bypass_method, // Legacy support: use_cloudscraper=true => "both"
     pythonPath: config.python_path,
+    concurrency: config.concurrency,
+    keepAliveIntervalMs: config.keepalive_interval_ms,
     browserFallback: {
       enabled: browserFallbackEnabled,
       provider: config.browser_fallback_provider,
@@ -550,6 +572,10 @@ Options:
       loginWaitTimeoutMs: config.login_wait_timeout_ms,
       loginCheckUrl: config.login_check_url,
     },
+    cassette:
+      config.cassette_mode !== "off" && config.cassette_path
+        ? { mode: config.cassette_mode, path: resolvePath(config.cassette_path), latency: config.cassette_latency }
+        : undefined,
   });
 
   const server = new McpServer(
@@ -658,6 +684,18 @@ Options:
         return;
       }
 
+      // Runtime metrics endpoint (Prometheus text by default, JSON with ?format=json)
+      if (req.method === "GET" && parsedUrl.pathname === "/metrics") {
+        if (parsedUrl.searchParams.get("format") === "json") {
+          res.writeHead(200, { "Content-Type": "application/json" });
+          res.end(JSON.stringify(siteState.getRuntimeStats()));
+        } else {
+          res.writeHead(200, { "Content-Type": "text/plain; version=0.0.4" });
+          res.end(siteState.getMetrics().toPrometheus());
+        }
+        return;
+      }
+
       // Auth page endpoint
       if (req.method === "GET" && parsedUrl.pathname === "/auth") {
         const authUrl = buildPendingAuthUrl();
@@ -858,6 +896,7 @@ Options:
     httpServer.listen(config.port, () => {
       logger.info(`HTTP transport listening on port ${config.port}`);
       logger.info(`Health check available at http://localhost:${config.port}/health`);
+      logger.info(`Metrics available at http://localhost:${config.port}/metrics`);
       logger.info(`MCP endpoint available at http://localhost:${config.port}/mcp`);
       if (pendingAuthKeys) {
         logger.info(`Auth page at http://localhost:${config.port}/auth`);
@@ -1,6 +1,8 @@
 import type { Logger } from "../util/logger.js";
-import { HttpClient, type AuthMode, type BypassMethod } from "../http/client.js";
+import { HttpClient, type AuthMode, type BypassMethod, type CassetteOptions, type SessionHealth } from "../http/client.js";
 import type { BrowserFallbackOptions } from "../http/browser_fallback.js";
+import { HttpMetrics } from "../http/metrics.js";
+import { RequestScheduler } from "../http/scheduler.js";
 
 export type AuthOverride = {
   site: string; // base URL or origin to match
@@ -25,6 +27,8 @@ export class SiteState {
   private currentSiteBase?: string;
   private currentClient?: HttpClient;
   private readonly clientCache = new Map<string, HttpClient>();
+  private readonly metrics = new HttpMetrics();
+  private readonly scheduler: RequestScheduler;
 
   constructor(
     private opts: {
@@ -36,8 +40,40 @@ export class SiteState {
       useCloudscraper?: boolean; // Deprecated, use bypassMethod instead
       pythonPath?: string;
       browserFallback?: BrowserFallbackOptions;
+      cassette?: CassetteOptions;
+      concurrency?: number; // Max concurrent upstream requests per host
+      keepAliveIntervalMs?: number; // Background session validation period; 0 disables
     }
-  ) {}
+  ) {
+    this.scheduler = new RequestScheduler(opts.concurrency);
+    this.metrics.registerGauge("session_pool_clients", "HTTP clients (one session per site) currently cached.", () => this.clientCache.size);
+    this.metrics.registerGauge("scheduler_interactive_running", "Interactive requests currently running.", () => this.scheduler.stats().running.interactive);
+    this.metrics.registerGauge("scheduler_interactive_queued", "Interactive requests waiting for a slot.", () => this.scheduler.stats().queued.interactive);
+    this.metrics.registerGauge("scheduler_background_running", "Background requests currently running.", () => this.scheduler.stats().running.background);
+    this.metrics.registerGauge("scheduler_background_queued", "Background requests waiting for leftover capacity.", () => this.scheduler.stats().queued.background);
+    this.metrics.registerGauge(
+      "session_keepalive_failures",
+      "Consecutive failed session renewals, summed over sites.",
+      () => Array.from(this.clientCache.values()).reduce((sum, c) => sum + c.getSessionHealth().consecutive_failures, 0)
+    );
+  }
+
+  // Keep-alive state of every cached client, keyed by site base URL
+  getSessionHealth(): Record<string, SessionHealth> {
+    const out: Record<string, SessionHealth> = {};
+    for (const [base, client] of this.clientCache) out[base] = client.getSessionHealth();
+    return out;
+  }
+
+  // Runtime counters shared by every client built from this state
+  getMetrics(): HttpMetrics {
+    return this.metrics;
+  }
+
+  // JSON runtime stats: metrics snapshot plus per-site keep-alive health
+  getRuntimeStats() {
+    return { ...this.metrics.snapshot(), sessions: this.getSessionHealth() };
+  }
 
   getSiteBase(): string | undefined {
     return this.currentSiteBase;
@@ -74,6 +110,10 @@ export class SiteState {
       pythonPath: this.opts.pythonPath,
       loginCredentials: loginCreds,
       browserFallback: this.opts.browserFallback,
+      metrics: this.metrics,
+      cassette: this.opts.cassette,
+      scheduler: this.scheduler,
+      keepAliveIntervalMs: this.opts.keepAliveIntervalMs,
     } as any);
     this.clientCache.set(base, client);
     return { base, client };
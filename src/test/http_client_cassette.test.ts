@@ -0,0 +1,89 @@
+import test from "node:test";
+import assert from "node:assert/strict";
+import { HttpClient } from "../http/client.js";
+import { Logger } from "../util/logger.js";
+
+function createClient(mode: "record" | "replay"): HttpClient {
+  return new HttpClient({
+    baseUrl: "https://example.com",
+    timeoutMs: 5_000,
+    logger: new Logger("silent"),
+    auth: { type: "none" },
+    bypassMethod: "curl_cffi",
+    cassette: { mode, path: "/tmp/nitan.cassette.jsonl", latency: "none" },
+  });
+}
+
+test("cassette options are forwarded to the wrapper request", async () => {
+  const client = createClient("record");
+  let forwarded: any;
+  (client as any).curlCffiClient = {
+    request: async (req: any) => {
+      forwarded = req.cassette;
+      return { success: true, status: 200, headers: { "content-type": "application/json" }, body: "{\"ok\":true}", cookies: {} };
+    },
+  };
+
+  assert.deepEqual(await client.get("/latest.json"), { ok: true });
+  assert.deepEqual(forwarded, { mode: "record", path: "/tmp/nitan.cassette.jsonl", latency: "none" });
+  await client.dispose();
+});
+
+test("replay mode does not fall back to native fetch on a cassette miss", async () => {
+  const client = createClient("replay");
+  (client as any).curlCffiClient = {
+    request: async () => ({ success: false, error: "No cassette entry for GET https://example.com/latest.json", error_type: "CassetteMiss" }),
+  };
+
+  const originalFetch = globalThis.fetch;
+  let fetchCalls = 0;
+  globalThis.fetch = (async () => {
+    fetchCalls += 1;
+    return new Response("{}", { status: 200 });
+  }) as any;
+
+  try {
+    await assert.rejects(client.get("/latest.json"), /CassetteMiss/);
+    assert.equal(fetchCalls, 0);
+  } finally {
+    globalThis.fetch = originalFetch as any;
+    await client.dispose();
+  }
+});
+
+test("replayed challenges never launch the browser fallback", async () => {
+  const client = new HttpClient({
+    baseUrl: "https://example.com",
+    timeoutMs: 5_000,
+    logger: new Logger("silent"),
+    auth: { type: "none" },
+    bypassMethod: "curl_cffi",
+    cassette: { mode: "replay", path: "/tmp/nitan.cassette.jsonl", latency: "none" },
+  });
+  (client as any).curlCffiClient = {
+    request: async () => ({
+      success: true,
+      status: 403,
+      headers: { "content-type": "text/html", "cf-mitigated": "challenge" },
+      body: "<title>Just a moment...</title>",
+      cookies: {},
+      replayed: true,
+    }),
+  };
+  let browserCalls = 0;
+  (client as any).browserFallbackClient = {
+    isEnabled: () => true,
+    request: async () => {
+      browserCalls += 1;
+      return { status: 200, headers: {}, body: "{}" };
+    },
+    dispose: async () => {},
+  };
+
+  try {
+    await assert.rejects(client.get("/latest.json"), /HTTP 403/);
+    assert.equal(browserCalls, 0);
+  } finally {
+    await client.dispose();
+  }
+});
@@ -0,0 +1,73 @@
+import test from "node:test";
+import assert from "node:assert/strict";
+import { HttpClient, HttpError } from "../http/client.js";
+import { HttpMetrics } from "../http/metrics.js";
+import { Logger } from "../util/logger.js";
+
+function createClient(metrics = new HttpMetrics()): HttpClient {
+  return new HttpClient({
+    baseUrl: "https://example.com",
+    timeoutMs: 5_000,
+    logger: new Logger("silent"),
+    auth: { type: "none" },
+    bypassMethod: "curl_cffi",
+    metrics,
+  });
+}
+
+test("profile that resolved a challenge in the wrapper is reused on the next request", async () => {
+  const client = createClient();
+  const profiles: Array<string | undefined> = [];
+  (client as any).curlCffiClient = {
+    request: async (req: any) => {
+      profiles.push(req.profile);
+      return {
+        success: true,
+        status: 200,
+        headers: { "content-type": "application/json" },
+        body: "{\"ok\":true}",
+        cookies: {},
+        challenge: { detected: profiles.length === 1, retried: profiles.length === 1, resolved: profiles.length === 1, profile: "safari15_5" },
+      };
+    },
+  };
+
+  try {
+    assert.deepEqual(await client.get("/latest.json"), { ok: true });
+    assert.deepEqual(await client.get("/latest.json"), { ok: true });
+    assert.deepEqual(profiles, [undefined, "safari15_5"]);
+  } finally {
+    await client.dispose();
+  }
+});
+
+test("wrapper challenge verdict overrides the header heuristic", async () => {
+  const metrics = new HttpMetrics();
+  const client = createClient(metrics);
+  let unresolved = false;
+  (client as any).curlCffiClient = {
+    request: async () => ({
+      success: true,
+      status: 403,
+      headers: { "content-type": "text/html", "cf-ray": "abc" },
+      body: unresolved ? "<title>Just a moment...</title>" : "forbidden",
+      cookies: {},
+      challenge: { detected: unresolved, retried: unresolved, resolved: false, profile: "chrome110" },
+      events: unresolved ? { challenge_retry: 1 } : {},
+    }),
+  };
+
+  try {
+    // A plain forum 403 behind Cloudflare is not a challenge
+    await assert.rejects(client.get("/t/1.json"), HttpError);
+    assert.equal(metrics.snapshot().events["example.com"]?.cloudflare_challenge, undefined);
+
+    unresolved = true;
+    await assert.rejects(client.get("/t/1.json"), HttpError);
+    const events = metrics.snapshot().events["example.com"];
+    assert.equal(events.cloudflare_challenge, 1);
+    assert.equal(events.challenge_retry, 1);
+  } finally {
+    await client.dispose();
+  }
+});
@@ -0,0 +1,130 @@
+import test, { mock } from "node:test";
+import assert from "node:assert/strict";
+import { HttpClient } from "../http/client.js";
+import { Logger } from "../util/logger.js";
+
+function createClient({ login = true } = {}): HttpClient {
+  return new HttpClient({
+    baseUrl: "https://example.com",
+    timeoutMs: 5_000,
+    logger: new Logger("silent"),
+    auth: { type: "none" },
+    bypassMethod: "curl_cffi",
+    loginCredentials: login ? { username: "alice", password: "secret" } : undefined,
+    keepAliveIntervalMs: 600_000,
+  });
+}
+
+const json = (status: number, body: unknown, extra: Record<string, unknown> = {}) => ({
+  success: true,
+  status,
+  headers: { "content-type": "application/json" },
+  body: JSON.stringify(body),
+  cookies: {},
+  ...extra,
+});
+
+test("keep-alive logs in again when Discourse dropped the session", async () => {
+  const client = createClient();
+  const sentCookies: string[][] = [];
+  let calls = 0;
+  (client as any).cookies.set("_t", "stale");
+  (client as any).cookies.set("cf_clearance", "clear");
+  (client as any).curlCffiClient = {
+    request: async (req: any) => {
+      sentCookies.push(Object.keys(req.cookies).sort());
+      calls += 1;
+      if (calls === 1) return json(404, { errors: ["not found"] });
+      return json(200, { current_user: { username: "alice" } }, { cookies: { _t: "fresh" }, cookie_expiry: { _t: 4_102_444_800 } });
+    },
+  };
+
+  try {
+    await client.keepAlive();
+    assert.equal(calls, 2);
+    // The retry must go out without the stale login cookie so the wrapper logs in
+    assert.deepEqual(sentCookies[1], ["cf_clearance"]);
+    const health = client.getSessionHealth();
+    assert.equal(health.consecutive_failures, 0);
+    assert.ok(health.last_success_at);
+    assert.equal(health.cookie_expiry?._t, "2100-01-01T00:00:00.000Z");
+  } finally {
+    await client.dispose();
+  }
+});
+
+test("keep-alive failures are recorded without throwing", async () => {
+  const client = createClient();
+  (client as any).curlCffiClient = {
+    request: async () => json(404, { errors: ["not found"] }),
+  };
+
+  try {
+    await client.keepAlive();
+    await client.keepAlive();
+    const health = client.getSessionHealth();
+    assert.equal(health.consecutive_failures, 2);
+    assert.match(health.last_error ?? "", /not logged in/);
+  } finally {
+    await client.dispose();
+  }
+});
+
+test("keep-alive stays off without credentials until a clearance expiry is known", async () => {
+  const client = createClient({ login: false });
+  try {
+    assert.equal((client as any).keepAliveTimer, undefined);
+  } finally {
+    await client.dispose();
+  }
+});
+
+test("authenticated foreground traffic postpones the periodic probe", async () => {
+  const client = createClient();
+  (client as any).curlCffiClient = {
+    request: async () => json(200, { ok: true }, { cookies: { _t: "token" } }),
+  };
+
+  try {
+    (client as any).lastSessionCheckAt = 0;
+    assert.equal((client as any).needsSessionRenewal(Date.now()), true);
+    await client.get("/latest.json");
+    assert.equal((client as any).needsSessionRenewal(Date.now()), false);
+  } finally {
+    await client.dispose();
+  }
+});
+
+test("an expiring cf_clearance is dropped and renewed by the timer", async () => {
+  mock.timers.enable({ apis: ["setInterval"] });
+  const client = createClient({ login: false });
+  const requests: Array<{ url: string; cookies: string[] }> = [];
+  const nowSeconds = Math.floor(Date.now() / 1000);
+  (client as any).curlCffiClient = {
+    request: async (req: any) => {
+      requests.push({ url: req.url, cookies: Object.keys(req.cookies) });
+      if (requests.length === 1) {
+        return json(200, { ok: true }, { cookies: { cf_clearance: "old" }, cookie_expiry: { cf_clearance: nowSeconds + 60 } });
+      }
+      return json(404, { errors: ["not found"] }, { cookies: { cf_clearance: "new" }, cookie_expiry: { cf_clearance: nowSeconds + 3600 } });
+    },
+  };
+
+  try {
+    await client.get("/latest.json");
+    assert.ok((client as any).keepAliveTimer, "timer starts once a clearance expiry is reported");
+
+    mock.timers.tick(60_000);
+    await (client as any).keepAliveInFlight;
+
+    assert.equal(requests.length, 2);
+    assert.equal(requests[1].url, "https://example.com/session/current.json");
+    assert.deepEqual(requests[1].cookies, []);
+    const health = client.getSessionHealth();
+    assert.equal(health.consecutive_failures, 0);
+    assert.equal(health.cookie_expiry?.cf_clearance, new Date((nowSeconds + 3600) * 1000).toISOString());
+  } finally {
+    mock.timers.reset();
+    await client.dispose();
+  }
+});
@@ -0,0 +1,77 @@
+import test from "node:test";
+import assert from "node:assert/strict";
+import { HttpMetrics, endpointClass } from "../http/metrics.js";
+import { HttpClient } from "../http/client.js";
+import { Logger } from "../util/logger.js";
+import { SiteState } from "../site/state.js";
+
+test("endpoint classes collapse ids, slugs and usernames", () => {
+  assert.equal(endpointClass("https://example.com/t/some-slug/123.json?page=2"), "/t/:slug/:id.json");
+  assert.equal(endpointClass("https://example.com/t/123.json"), "/t/:id.json");
+  assert.equal(endpointClass("https://example.com/raw/123/4"), "/raw/:id/:id");
+  assert.equal(endpointClass("https://example.com/u/alice/summary.json"), "/u/:username/summary.json");
+  assert.equal(endpointClass("https://example.com/notifications.json?limit=5"), "/notifications.json");
+});
+
+test("metrics aggregate per host, endpoint and engine and export Prometheus text", () => {
+  const metrics = new HttpMetrics();
+  metrics.recordRequest("https://example.com/t/a/1.json", "curl_cffi", 120, true);
+  metrics.recordRequest("https://example.com/t/b/2.json", "curl_cffi", 40, false);
+  metrics.recordEvent("https://example.com/t/a/1.json", "login");
+  const end = metrics.begin("curl_cffi");
+
+  const snapshot = metrics.snapshot();
+  assert.equal(snapshot.by_endpoint["/t/:slug/:id.json"].requests, 2);
+  assert.equal(snapshot.by_engine["curl_cffi"].errors, 1);
+  assert.equal(snapshot.by_host["example.com"].latency.count, 2);
+  assert.equal(snapshot.events["example.com"].login, 1);
+  assert.equal(snapshot.in_flight.curl_cffi, 1);
+  end();
+  assert.equal(metrics.snapshot().in_flight.curl_cffi, 0);
+
+  const text = metrics.toPrometheus();
+  assert.match(text, /nitan_http_requests_total\{host="example.com",endpoint="\/t\/:slug\/:id.json",engine="curl_cffi"\} 2/);
+  assert.match(text, /nitan_http_request_duration_ms_bucket\{host="example.com",endpoint="\/t\/:slug\/:id.json",engine="curl_cffi",le="50"\} 1/);
+  assert.match(text, /nitan_http_events_total\{host="example.com",event="login"\} 1/);
+});
+
+test("http client records wrapper events and cache lookups", async () => {
+  const metrics = new HttpMetrics();
+  const client = new HttpClient({
+    baseUrl: "https://example.com",
+    timeoutMs: 5_000,
+    logger: new Logger("silent"),
+    auth: { type: "none" },
+    bypassMethod: "curl_cffi",
+    metrics,
+  });
+  (client as any).curlCffiClient = {
+    request: async () => ({
+      success: true,
+      status: 200,
+      headers: { "content-type": "application/json" },
+      body: "{\"ok\":true}",
+      cookies: {},
+      events: { warmup: 1, login: 0, csrf_fetch: 0 },
+    }),
+  };
+
+  assert.deepEqual(await client.getCached("/site.json", 60_000), { ok: true });
+  assert.deepEqual(await client.getCached("/site.json", 60_000), { ok: true });
+
+  const snapshot = metrics.snapshot();
+  assert.equal(snapshot.by_engine["curl_cffi"].requests, 1);
+  assert.deepEqual(snapshot.events["example.com"], { cache_miss: 1, warmup: 1, cache_hit: 1 });
+  await client.dispose();
+});
+
+test("runtime stats include per-site session health", async () => {
+  const siteState = new SiteState({ logger: new Logger("silent"), timeoutMs: 5_000, defaultAuth: { type: "none" } });
+  const { base, client } = siteState.selectSite("https://example.com");
+
+  const stats = siteState.getRuntimeStats();
+  assert.ok("by_host" in stats);
+  assert.deepEqual(Object.keys(stats.sessions), [base]);
+  assert.equal(stats.sessions[base].consecutive_failures, 0);
+  await client.dispose();
+});
@@ -0,0 +1,111 @@
+import test from "node:test";
+import assert from "node:assert/strict";
+import { RequestScheduler } from "../http/scheduler.js";
+
+function deferred() {
+  let resolve!: () => void;
+  const promise = new Promise<void>((r) => (resolve = r));
+  return { promise, resolve };
+}
+
+test("background work leaves a slot free for interactive requests", async () => {
+  const scheduler = new RequestScheduler(2);
+  const gate = deferred();
+  const started: string[] = [];
+
+  const background = [1, 2, 3].map((i) =>
+    scheduler.run("example.com", "background", async () => {
+      started.push(`bg${i}`);
+      await gate.promise;
+    })
+  );
+  assert.deepEqual(started, ["bg1"]);
+  assert.deepEqual(scheduler.stats().queued, { interactive: 0, background: 2 });
+
+  const interactive = scheduler.run("example.com", "interactive", async () => {
+    started.push("ui");
+    return "done";
+  });
+  assert.deepEqual(started, ["bg1", "ui"]);
+  assert.equal(await interactive, "done");
+
+  gate.resolve();
+  await Promise.all(background);
+  assert.deepEqual(started, ["bg1", "ui", "bg2", "bg3"]);
+  assert.deepEqual(scheduler.stats().running, { interactive: 0, background: 0 });
+});
+
+test("queued interactive requests are dispatched before queued background work", async () => {
+  const scheduler = new RequestScheduler(1);
+  const gate = deferred();
+  const order: string[] = [];
+
+  const first = scheduler.run("example.com", "interactive", async () => {
+    order.push("first");
+    await gate.promise;
+  });
+  const bg = scheduler.run("example.com", "background", async () => {
+    order.push("bg");
+  });
+  const ui = scheduler.run("example.com", "interactive", async () => {
+    order.push("ui");
+  });
+
+  gate.resolve();
+  await Promise.all([first, bg, ui]);
+  assert.deepEqual(order, ["first", "ui", "bg"]);
+});
+
+test("hosts are scheduled independently and failures release their slot", async () => {
+  const scheduler = new RequestScheduler(1);
+  await assert.rejects(scheduler.run("a.example", "interactive", async () => { throw new Error("boom"); }), /boom/);
+  const results = await Promise.all([
+    scheduler.run("a.example", "interactive", async () => "a"),
+    scheduler.run("b.example", "interactive", async () => "b"),
+  ]);
+  assert.deepEqual(results, ["a", "b"]);
+});
+
+test("with a single slot background work only starts while the host is idle", async () => {
+  const scheduler = new RequestScheduler(1);
+  const gate = deferred();
+  const order: string[] = [];
+
+  const ui = scheduler.run("example.com", "interactive", async () => {
+    order.push("ui");
+    await gate.promise;
+  });
+  const bg = scheduler.run("example.com", "background", async () => {
+    order.push("bg");
+  });
+  assert.deepEqual(order, ["ui"]);
+  assert.deepEqual(scheduler.stats().queued, { interactive: 0, background: 1 });
+
+  gate.resolve();
+  await Promise.all([ui, bg]);
+  assert.deepEqual(order, ["ui", "bg"]);
+});
+
+test("aborted queued jobs are dropped without taking a slot", async () => {
+  const scheduler = new RequestScheduler(1);
+  const gate = deferred();
+  const started: string[] = [];
+
+  const first = scheduler.run("example.com", "interactive", async () => {
+    started.push("first");
+    await gate.promise;
+  });
+  const controller = new AbortController();
+  const cancelled = scheduler.run("example.com", "interactive", async () => {
+    started.push("cancelled");
+  }, controller.signal);
+
+  controller.abort();
+  await assert.rejects(cancelled, { name: "AbortError" });
+  assert.deepEqual(scheduler.stats().queued, { interactive: 0, background: 0 });
+
+  gate.resolve();
+  await first;
+  assert.deepEqual(started, ["first"]);
+  await assert.rejects(scheduler.run("example.com", "interactive", async () => "late", controller.signal), { name: "AbortError" });
+});
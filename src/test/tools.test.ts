@@ -5,6 +5,7 @@ import { Logger } from '../util/logger.js';
 import { registerAllTools } from '../tools/registry.js';
 import { SiteState } from '../site/state.js';
 import { registerListNotifications } from '../tools/builtin/list_notifications.js';
+import { registerListHotTopics } from '../tools/builtin/list_hot_topics.js';
 import { readFile } from 'node:fs/promises';
 import path from 'node:path';
 import { fileURLToPath } from 'node:url';
@@ -41,6 +42,7 @@ function expectedRegisteredToolNames(hideSelectSite = false) {
     'discourse_list_excellent_topics',
     'discourse_list_funny_topics',
     'discourse_get_trust_level_progress',
+    'discourse_get_runtime_stats',
   ];
 
   return hideSelectSite ? names : ['discourse_select_site', ...names];
@@ -494,3 +496,240 @@ test('notifications tool prompts auth setup when neither API key nor login crede
   assert.equal(result?.isError, true);
   assert.match(text, /Set up an API key or provide NITAN_USERNAME\/NITAN_PASSWORD/);
 });
+
+test('notifications tool incremental mode returns only new items and reuses fetched replies', async () => {
+  const fakeServerTools: Record<string, { handler: Function }> = {};
+  const fakeServer: any = {
+    registerTool(name: string, _meta: any, handler: Function) {
+      fakeServerTools[name] = { handler };
+    },
+  };
+
+  let notifications: any[] = [
+    { id: 10, notification_type: 2, read: false, topic_id: 1, post_number: 2, slug: 'a', created_at: '2025-01-01T00:00:00Z', data: {} },
+    { id: 11, notification_type: 5, read: false, topic_id: 1, post_number: 3, slug: 'a', created_at: '2025-01-01T00:00:00Z', data: {} },
+  ];
+  const requestedUrls: string[] = [];
+  const fakeSiteState: any = {
+    ensureSelectedSite() {
+      return {
+        base: 'https://www.uscardforum.com',
+        client: {
+          async get(url: string) {
+            requestedUrls.push(url);
+            if (url.startsWith('/notifications.json')) return { notifications };
+            if (url.startsWith('/raw/')) return `body of ${url}`;
+            throw new Error(`unexpected ${url}`);
+          },
+        },
+      };
+    },
+    hasAuthenticationConfiguredForSite() {
+      return true;
+    },
+  };
+
+  registerListNotifications(fakeServer, { siteState: fakeSiteState, maxReadLength: 50000 } as any, {});
+  const handler = fakeServerTools['discourse_list_notifications'].handler;
+
+  const first = JSON.parse((await handler({ incremental: true }, {})).content[0].text);
+  assert.equal(first.notifications.length, 2);
+  assert.equal(first.cursor, 11);
+
+  const idle = JSON.parse((await handler({ incremental: true, since_id: first.cursor }, {})).content[0].text);
+  assert.equal(idle.cursor, 11);
+  assert.match(idle.message, /No new notifications since last poll/);
+
+  notifications = [
+    { id: 12, notification_type: 2, read: false, topic_id: 1, post_number: 2, slug: 'a', created_at: '2025-01-02T00:00:00Z', data: {} },
+    ...notifications,
+  ];
+  const next = JSON.parse((await handler({ incremental: true, since_id: idle.cursor }, {})).content[0].text);
+  assert.equal(next.cursor, 12);
+  assert.equal(next.notifications.length, 1);
+  assert.equal(next.notifications[0].content, 'body of /raw/1/2');
+  assert.equal(requestedUrls.filter((url) => url.startsWith('/raw/')).length, 1);
+});
+
+test('notifications tool without incremental always refetches reply bodies', async () => {
+  const fakeServerTools: Record<string, { handler: Function }> = {};
+  const fakeServer: any = {
+    registerTool(name: string, _meta: any, handler: Function) {
+      fakeServerTools[name] = { handler };
+    },
+  };
+
+  let rawFetches = 0;
+  const fakeSiteState: any = {
+    ensureSelectedSite() {
+      return {
+        base: 'https://www.uscardforum.com',
+        client: {
+          async get(url: string) {
+            if (url.startsWith('/notifications.json')) {
+              return { notifications: [{ id: 10, notification_type: 2, read: false, topic_id: 1, post_number: 2, slug: 'a', created_at: '2025-01-01T00:00:00Z', data: {} }] };
+            }
+            if (url.startsWith('/raw/')) return `body v${++rawFetches}`;
+            throw new Error(`unexpected ${url}`);
+          },
+        },
+      };
+    },
+    hasAuthenticationConfiguredForSite() {
+      return true;
+    },
+  };
+
+  registerListNotifications(fakeServer, { siteState: fakeSiteState, maxReadLength: 50000 } as any, {});
+  const handler = fakeServerTools['discourse_list_notifications'].handler;
+
+  await handler({}, {});
+  const second = JSON.parse((await handler({}, {})).content[0].text);
+  assert.equal(rawFetches, 2);
+  assert.equal(second[0].content, 'body v2');
+});
+
+test('hot topics tool incremental mode returns only new or bumped topics', async () => {
+  const fakeServerTools: Record<string, { handler: Function }> = {};
+  const fakeServer: any = {
+    registerTool(name: string, _meta: any, handler: Function) {
+      fakeServerTools[name] = { handler };
+    },
+  };
+
+  let topics: any[] = [
+    { id: 1, title: 'One', slug: 'one', bumped_at: '2025-01-01T00:00:00.000Z' },
+    { id: 2, title: 'Two', slug: 'two', bumped_at: '2025-01-02T00:00:00.000Z' },
+  ];
+  const fakeSiteState: any = {
+    ensureSelectedSite() {
+      return {
+        base: 'https://www.uscardforum.com',
+        client: {
+          async get(url: string) {
+            if (url === '/hot.json') return { topic_list: { topics } };
+            throw new Error(`unexpected ${url}`);
+          },
+        },
+      };
+    },
+  };
+
+  registerListHotTopics(fakeServer, { siteState: fakeSiteState } as any, {});
+  const handler = fakeServerTools['discourse_list_hot_topics'].handler;
+
+  const first = JSON.parse((await handler({ incremental: true }, {})).content[0].text);
+  assert.deepEqual(first.topics.map((t: any) => t.id), [1, 2]);
+  assert.equal(first.since, '2025-01-02T00:00:00.000Z');
+
+  const idle = JSON.parse((await handler({ incremental: true, since: first.since }, {})).content[0].text);
+  assert.deepEqual(idle.topics, []);
+  assert.match(idle.message, /No new or updated hot topics since last poll/);
+
+  topics = [
+    { id: 1, title: 'One', slug: 'one', bumped_at: '2025-01-03T00:00:00.000Z' },
+    { id: 2, title: 'Two', slug: 'two', bumped_at: '2025-01-02T00:00:00.000Z' },
+  ];
+  const next = JSON.parse((await handler({ incremental: true, since: idle.since }, {})).content[0].text);
+  assert.deepEqual(next.topics.map((t: any) => t.id), [1]);
+  assert.equal(next.since, '2025-01-03T00:00:00.000Z');
+});
+
+test('hot topics tool incremental mode drains a listing longer than limit', async () => {
+  const fakeServerTools: Record<string, { handler: Function }> = {};
+  const fakeServer: any = {
+    registerTool(name: string, _meta: any, handler: Function) {
+      fakeServerTools[name] = { handler };
+    },
+  };
+
+  // Hotness order is unrelated to bumped_at
+  const topics = Array.from({ length: 30 }, (_, i) => ({
+    id: i + 1,
+    title: `Topic ${i + 1}`,
+    slug: `topic-${i + 1}`,
+    bumped_at: new Date(Date.UTC(2026, 9, 18) - ((i * 7) % 30) * 3_600_000).toISOString(),
+  }));
+  const fakeSiteState: any = {
+    ensureSelectedSite() {
+      return {
+        base: 'https://www.uscardforum.com',
+        client: {
+          async get(url: string) {
+            if (url === '/hot.json') return { topic_list: { topics } };
+            throw new Error(`unexpected ${url}`);
+          },
+        },
+      };
+    },
+  };
+
+  registerListHotTopics(fakeServer, { siteState: fakeSiteState } as any, {});
+  const handler = fakeServerTools['discourse_list_hot_topics'].handler;
+
+  const seen = new Set<number>();
+  let since: string | undefined;
+  for (let poll = 0; poll < 3; poll++) {
+    const out = JSON.parse((await handler({ incremental: true, limit: 10, since }, {})).content[0].text);
+    assert.equal(out.topics.length, 10);
+    for (const topic of out.topics) {
+      assert.equal(seen.has(topic.id), false, `topic ${topic.id} returned twice`);
+      seen.add(topic.id);
+    }
+    since = out.since;
+  }
+  assert.equal(seen.size, 30);
+
+  const idle = JSON.parse((await handler({ incremental: true, limit: 10, since }, {})).content[0].text);
+  assert.deepEqual(idle.topics, []);
+  assert.equal(idle.since, since);
+});
+
+test('notifications tool incremental mode pages back instead of skipping a burst', async () => {
+  const fakeServerTools: Record<string, { handler: Function }> = {};
+  const fakeServer: any = {
+    registerTool(name: string, _meta: any, handler: Function) {
+      fakeServerTools[name] = { handler };
+    },
+  };
+
+  // ids 1..total, newest first; recent pages honour limit, history pages hold 60
+  let total = 20;
+  const all = () =>
+    Array.from({ length: total }, (_, i) => ({ id: total - i, notification_type: 5, read: false, topic_id: 1, slug: 'a', created_at: '2025-01-01T00:00:00Z', data: {} }));
+  const requestedUrls: string[] = [];
+  const fakeSiteState: any = {
+    ensureSelectedSite() {
+      return {
+        base: 'https://www.uscardforum.com',
+        client: {
+          async get(url: string) {
+            requestedUrls.push(url);
+            const params = new URL(url, 'https://x').searchParams;
+            if (params.get('recent')) return { notifications: all().slice(0, Number(params.get('limit'))) };
+            const offset = Number(params.get('offset'));
+            return { notifications: all().slice(offset, offset + 60) };
+          },
+        },
+      };
+    },
+    hasAuthenticationConfiguredForSite() {
+      return true;
+    },
+  };
+
+  registerListNotifications(fakeServer, { siteState: fakeSiteState, maxReadLength: 50000 } as any, {});
+  const handler = fakeServerTools['discourse_list_notifications'].handler;
+
+  const caughtUp = JSON.parse((await handler({ incremental: true, limit: 5, since_id: 8 }, {})).content[0].text);
+  assert.deepEqual(caughtUp.notifications.length, 12);
+  assert.equal(caughtUp.cursor, 20);
+  assert.equal(caughtUp.truncated, undefined);
+  assert.ok(requestedUrls.includes('/notifications.json?offset=0'));
+
+  // A backlog beyond the catch-up window is flagged rather than silently dropped
+  total = 1000;
+  const flagged = JSON.parse((await handler({ incremental: true, limit: 5, since_id: 8 }, {})).content[0].text);
+  assert.equal(flagged.truncated, true);
+  assert.equal(flagged.cursor, 1000);
+});
@@ -0,0 +1,33 @@
+import { z } from "zod";
+import type { RegisterFn } from "../types.js";
+
+export const registerGetRuntimeStats: RegisterFn = (server, ctx) => {
+  const schema = z
+    .object({
+      format: z
+        .enum(["json", "prometheus"])
+        .optional()
+        .describe("Output format: json (default) or prometheus text exposition"),
+    })
+    .strict();
+
+  server.registerTool(
+    "discourse_get_runtime_stats",
+    {
+      title: "Get Runtime Stats",
+      description: "Get cumulative request counters, latency histograms, bypass events (warm-ups, logins, CSRF fetches, Cloudflare challenges, browser fallbacks, cache hits/misses), current occupancy and session keep-alive health of the HTTP layer.",
+      inputSchema: schema.shape,
+    },
+    async ({ format = "json" }, _extra: any) => {
+      try {
+        const text =
+          format === "prometheus"
+            ? ctx.siteState.getMetrics().toPrometheus()
+            : JSON.stringify(ctx.siteState.getRuntimeStats(), null, 2);
+        return { content: [{ type: "text", text }] };
+      } catch (e: any) {
+        return { content: [{ type: "text", text: `Failed to get runtime stats: ${e?.message || String(e)}` }], isError: true };
+      }
+    }
+  );
+};
@@ -3,6 +3,13 @@ import type { RegisterFn } from "../types.js";
 import { getCategoryName } from "../categories.js";
 import { formatTimestamp } from "../../util/timestamp.js";
 
+// Topics are "changed" when their bumped_at moves past the caller's watermark;
+// topics without a parseable timestamp sort first and are never "changed" again
+function bumpedAtOf(topic: any): number {
+  const ms = Date.parse(topic.bumped_at ?? topic.last_posted_at ?? "");
+  return Number.isNaN(ms) ? -Infinity : ms;
+}
+
 export const registerListHotTopics: RegisterFn = (server, ctx) => {
   const schema = z
     .object({
@@ -13,6 +20,14 @@ export const registerListHotTopics: RegisterFn = (server, ctx) => {
         .max(50)
         .optional()
         .describe("Maximum number of hot topics to return (default: 10, max: 50)"),
+      incremental: z
+        .boolean()
+        .optional()
+        .describe("If true, return { since, topics } so the caller can poll again with since (default: false)"),
+      since: z
+        .string()
+        .optional()
+        .describe("Incremental mode only: bumped_at watermark from a previous poll; only newer or bumped topics are returned"),
     })
     .strict();
 
@@ -23,7 +38,7 @@ export const registerListHotTopics: RegisterFn = (server, ctx) => {
       description: "Get the current hot/trending topics from the forum. Hot topics are based on recent activity, views, and engagement.",
       inputSchema: schema.shape,
     },
-    async ({ limit = 10 }, _extra: any) => {
+    async ({ limit = 10, incremental = false, since }, _extra: any) => {
       try {
         const { base, client } = ctx.siteState.ensureSelectedSite();
         
@@ -33,15 +48,50 @@ export const registerListHotTopics: RegisterFn = (server, ctx) => {
         const list = data?.topic_list ?? data;
         const topics: any[] = Array.isArray(list?.topics) ? list.topics : [];
         
+        // In incremental mode, drop topics not bumped after the caller's watermark
+        const sinceMs = incremental && since !== undefined ? Date.parse(since) : NaN;
+        if (incremental && since !== undefined && Number.isNaN(sinceMs)) {
+          return {
+            content: [{ type: "text", text: `Invalid since watermark: ${since}` }],
+            isError: true,
+          };
+        }
+        let candidates = topics;
+        if (incremental) {
+          // /hot.json is ordered by hotness, so drain changes oldest-bumped first:
+          // then the watermark is the newest returned bumped_at and nothing cut by
+          // the limit can fall behind it
+          candidates = topics
+            .filter((topic) => Number.isNaN(sinceMs) || bumpedAtOf(topic) > sinceMs)
+            .sort((a, b) => bumpedAtOf(a) - bumpedAtOf(b) || 0);
+        }
+        
         // Limit the results
-        const limitedTopics = topics.slice(0, limit);
+        const limitedTopics = candidates.slice(0, limit);
+        
+        let watermark = Number.isNaN(sinceMs) ? -Infinity : sinceMs;
+        for (const topic of limitedTopics) watermark = Math.max(watermark, bumpedAtOf(topic));
+        // A cut topic sharing the newest timestamp must stay above the watermark
+        const firstCut = candidates[limit];
+        if (firstCut && bumpedAtOf(firstCut) === watermark) watermark -= 1;
+        const nextSince = Number.isFinite(watermark) ? new Date(watermark).toISOString() : since ?? null;
+        
+        // Show the selected topics in hotness order
+        if (incremental) {
+          const hotRank = new Map(topics.map((topic, i) => [topic, i]));
+          limitedTopics.sort((a, b) => hotRank.get(a)! - hotRank.get(b)!);
+        }
         
         if (limitedTopics.length === 0) {
+          let text = Number.isNaN(sinceMs) ? "No hot topics found." : "No new or updated hot topics since last poll.";
+          if (incremental) {
+            text = JSON.stringify({ since: nextSince, topics: [], message: text }, null, 2);
+          }
           return {
             content: [
               {
                 type: "text",
-                text: "No hot topics found.",
+                text,
               },
             ],
           };
@@ -93,7 +143,7 @@ export const registerListHotTopics: RegisterFn = (server, ctx) => {
           created_at: formatTimestamp(topic.created_at || ""),
         }));
         
-        const text = JSON.stringify(jsonOutput, null, 2);
+        const text = JSON.stringify(incremental ? { since: nextSince, topics: jsonOutput } : jsonOutput, null, 2);
         
         return { content: [{ type: "text", text }] };
       } catch (e: any) {
@@ -1,6 +1,12 @@
 import { z } from "zod";
 import type { RegisterFn } from "../types.js";
 import { formatTimestamp } from "../../util/timestamp.js";
+import { TTLCache } from "../../http/cache.js";
+
+// Reply bodies rarely change once posted; keep them around across polls
+const REPLY_CONTENT_TTL_MS = 30 * 60 * 1000;
+// Older pages fetched to close the gap when more notifications than `limit` arrived between polls
+const MAX_CATCH_UP_PAGES = 5;
 
 function collectErrorText(error: any): string {
   const parts: string[] = [];
@@ -40,6 +46,9 @@ function isExplicitNotLoggedInError(error: any): boolean {
 }
 
 export const registerListNotifications: RegisterFn = (server, ctx) => {
+  // Already-fetched /raw/ reply bodies for incremental polls, keyed by site + topic/post
+  const replyContents = new TTLCache<string, string>(200);
+
   const schema = z
     .object({
       limit: z
@@ -53,6 +62,16 @@ export const registerListNotifications: RegisterFn = (server, ctx) => {
         .boolean()
         .optional()
         .describe("If true, only return unread notifications (default: true)"),
+      incremental: z
+        .boolean()
+        .optional()
+        .describe("If true, return { cursor, notifications } so the caller can poll again with since_id (default: false)"),
+      since_id: z
+        .number()
+        .int()
+        .nonnegative()
+        .optional()
+        .describe("Incremental mode only: return notifications with an id above this cursor from a previous poll"),
     })
     .strict();
 
@@ -63,7 +82,7 @@ export const registerListNotifications: RegisterFn = (server, ctx) => {
       description: "Get user notifications from the forum. Requires either a User API key or configured login credentials.",
       inputSchema: schema.shape,
     },
-    async ({ limit = 30, unread_only = true }, _extra: any) => {
+    async ({ limit = 30, unread_only = true, incremental = false, since_id }, _extra: any) => {
       try {
         const { base, client } = ctx.siteState.ensureSelectedSite();
         if (!ctx.siteState.hasAuthenticationConfiguredForSite(base)) {
@@ -85,35 +104,97 @@ export const registerListNotifications: RegisterFn = (server, ctx) => {
         
         let notifications: any[] = Array.isArray(data?.notifications) ? data.notifications : [];
         
+        // In incremental mode the cursor is the highest id fetched; the caller
+        // passes it back as since_id, so no per-caller state lives on the server
+        const previousCursor = incremental ? since_id : undefined;
+        
+        // A full page with nothing at or below the cursor means more arrived than
+        // fit; page back through the history until the cursor is reached
+        let truncated = false;
+        if (previousCursor !== undefined && notifications.length >= limit) {
+          const reachesCursor = (list: any[]) => list.some((n) => typeof n.id === "number" && n.id <= previousCursor);
+          const seenIds = new Set(notifications.map((n) => n.id));
+          let offset = 0;
+          let pages = 0;
+          while (!reachesCursor(notifications)) {
+            if (pages >= MAX_CATCH_UP_PAGES) {
+              truncated = true;
+              break;
+            }
+            const older = (await client.get(`/notifications.json?offset=${offset}`)) as any;
+            const page: any[] = Array.isArray(older?.notifications) ? older.notifications : [];
+            if (page.length === 0) break;
+            for (const notif of page) {
+              if (!seenIds.has(notif.id)) {
+                seenIds.add(notif.id);
+                notifications.push(notif);
+              }
+            }
+            offset += page.length;
+            pages++;
+          }
+        }
+        let cursor = previousCursor ?? 0;
+        for (const notif of notifications) {
+          if (typeof notif.id === "number" && notif.id > cursor) cursor = notif.id;
+        }
+        if (previousCursor !== undefined) {
+          notifications = notifications.filter((n) => typeof n.id === "number" && n.id > previousCursor);
+        }
+        
         // Filter for unread only if requested
         if (unread_only) {
           notifications = notifications.filter((n) => n.read === false);
         }
         
         if (notifications.length === 0) {
+          let text = unread_only ? "No unread notifications." : "No notifications found.";
+          if (previousCursor !== undefined) {
+            text = "No new notifications since last poll.";
+          }
+          if (incremental) {
+            text = JSON.stringify({ cursor, notifications: [], message: text, ...(truncated ? { truncated } : {}) }, null, 2);
+          }
           return {
             content: [
               {
                 type: "text",
-                text: unread_only ? "No unread notifications." : "No notifications found.",
+                text,
               },
             ],
           };
         }
         
-        // Fetch content for "replied" notifications (type 2)
+        // Fetch content for "replied" notifications (type 2); incremental polls reuse bodies fetched earlier.
+        // The fan-out runs at background priority so it only uses capacity left over by tool calls.
         const contentMap = new Map<string, string>();
+        const pending = new Map<string, Promise<void>>();
         for (const notif of notifications) {
           if (notif.notification_type === 2 && notif.topic_id && notif.post_number) {
-            try {
-              const rawContent = (await client.get(`/raw/${notif.topic_id}/${notif.post_number}`)) as string;
-              const key = `${notif.topic_id}/${notif.post_number}`;
-              contentMap.set(key, rawContent.slice(0, maxReadLength));
-            } catch (e) {
-              // If fetching content fails, just skip it
+            const key = `${notif.topic_id}/${notif.post_number}`;
+            if (pending.has(key)) continue;
+            const storeKey = `${base}/${key}`;
+            const stored = incremental ? replyContents.get(storeKey) : undefined;
+            if (stored !== undefined) {
+              contentMap.set(key, stored);
+              continue;
             }
+            pending.set(
+              key,
+              (async () => {
+                try {
+                  const rawContent = (await client.get(`/raw/${key}`, { priority: "background" })) as string;
+                  const content = rawContent.slice(0, maxReadLength);
+                  contentMap.set(key, content);
+                  if (incremental) replyContents.set(storeKey, content, REPLY_CONTENT_TTL_MS);
+                } catch (e) {
+                  // If fetching content fails, just skip it
+                }
+              })()
+            );
           }
         }
+        await Promise.all(pending.values());
         
         // Map notification types to readable labels
         const notificationTypeLabels: Record<number, string> = {
@@ -173,7 +254,12 @@ export const registerListNotifications: RegisterFn = (server, ctx) => {
           return result;
         });
         
-        const text = JSON.stringify(jsonOutput, null, 2);
+        // truncated: older notifications past the catch-up window were skipped
+        const text = JSON.stringify(
+          incremental ? { cursor, notifications: jsonOutput, ...(truncated ? { truncated } : {}) } : jsonOutput,
+          null,
+          2
+        );
         return { content: [{ type: "text", text }] };
       } catch (e: any) {
         if (isCloudflareChallengeError(e)) {
@@ -16,6 +16,7 @@ import { registerListTopTopics } from "./builtin/list_top_topics.js";
 import { registerListExcellentTopics } from "./builtin/list_excellent_topics.js";
 import { registerListFunnyTopics } from "./builtin/list_funny_topics.js";
 import { registerGetTrustLevelProgress } from "./builtin/get_trust_level_progress.js";
+import { registerGetRuntimeStats } from "./builtin/get_runtime_stats.js";
 
 export interface RegistryOptions {
   allowWrites?: boolean;
@@ -46,4 +47,5 @@ export async function registerAllTools(
   registerListExcellentTopics(server, ctx, { allowWrites: false });
   registerListFunnyTopics(server, ctx, { allowWrites: false });
   registerGetTrustLevelProgress(server, ctx, { allowWrites: false });
+  registerGetRuntimeStats(server, ctx, { allowWrites: false });
 }